@@ -20,9 +20,22 @@ def create_app(config_name='default'):
     bootstrap.init_app(app)
     csrf.init_app(app)
     
+    # Register request-scoped database connection handling
+    from app.models.db import init_app as init_db_app
+    init_db_app(app)
+    
+    # Background import/export jobs
+    from app.utils.jobs import jobs
+    jobs.init_app(app)
+    
     # Register blueprints
     from app.controllers.main import main as main_blueprint
     app.register_blueprint(main_blueprint)
+
+    # Register CLI commands (flask import-records / export-delta ...)
+    from app.controllers.commands import import_records_command, export_delta_command
+    app.cli.add_command(import_records_command)
+    app.cli.add_command(export_delta_command)
     
     # Create database tables
     with app.app_context():
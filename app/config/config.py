@@ -6,6 +6,33 @@ class Config:
     """Base configuration settings"""
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'school-nurse-health-log-secret-key'
     DB_FILE = os.path.join(basedir, 'instance', 'nurse_records.db')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    RECORDS_PER_PAGE = 25
+    # Searches stop counting matches here and show "N+" instead
+    SEARCH_COUNT_LIMIT = 1000
+    # Trigram index for substring search on patient IDs and names
+    SEARCH_TRIGRAM_INDEX = os.environ.get('SEARCH_TRIGRAM_INDEX', '1') != '0'
+    # Rows parsed and inserted per transaction by the streaming importer
+    IMPORT_CHUNK_SIZE = 1000
+    # Rows fetched from the cursor per round trip by the streaming exporter
+    EXPORT_BATCH_SIZE = 1000
+    # Finished exports are kept here, keyed by data version and filters, and
+    # served again until the data changes; least recently used files are
+    # evicted past the size limit (0 turns the cache off)
+    EXPORT_CACHE_DIR = os.path.join(basedir, 'instance', 'export_cache')
+    EXPORT_CACHE_MAX_BYTES = int(os.environ.get('EXPORT_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+    # Delta exports leave out changes this recent (seconds) so writes still
+    # committing are picked up by the next delta instead of being skipped
+    EXPORT_DELTA_SETTLE_SECONDS = 5
+    # Worker processes parsing the sheets of zip and multi-sheet imports;
+    # each one costs ~80MB for its imports alone, so keep this small on
+    # small instances (1 parses every sheet in the web worker itself)
+    IMPORT_PROCESSES = int(os.environ.get('IMPORT_PROCESSES', 2))
+    # Background import/export jobs: worker threads per process, where their
+    # uploads and outputs live, and how long those files are kept (seconds)
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOBS_DIR = os.path.join(basedir, 'instance', 'jobs')
+    JOB_FILE_MAX_AGE = 24 * 60 * 60
     EXCEL_FILE = os.path.join(basedir, 'SchoolNurse_HealthLog.xlsx')
     
     @staticmethod
@@ -0,0 +1,78 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from ..utils.export_utils import open_delta
+from ..utils.import_utils import import_file, validate_file
+
+@click.command('import-records')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--no-headers', is_flag=True, help='The first row is data, not column names.')
+@click.option('--chunk-size', type=int, default=None, help='Rows parsed and inserted per batch.')
+@click.option('--force', is_flag=True, help='Import again even if this file was imported before.')
+@click.option('--dry-run', is_flag=True, help='Only validate the file; nothing is saved.')
+@click.option('--report', type=click.Path(dir_okay=False), default=None,
+              help='Where --dry-run writes its CSV report (default: PATH.report.csv).')
+@with_appcontext
+def import_records_command(path, no_headers, chunk_size, force, dry_run, report):
+    """Import health records from an Excel, CSV or NDJSON file, or a zip of them.
+
+    Re-running on a file that stopped part-way resumes after the last saved row.
+    """
+    chunk_size = chunk_size or current_app.config['IMPORT_CHUNK_SIZE']
+    if dry_run:
+        report = report or f'{path}.report.csv'
+        try:
+            result = validate_file(path, report, has_headers=not no_headers, chunk_size=chunk_size)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'Checked {result["rows"]} rows: {result["valid"]} valid, {result["invalid"]} with problems')
+        for skipped in result['skipped_sources']:
+            click.echo(f'Skipped {skipped}', err=True)
+        for column, count in result['issues'].items():
+            click.echo(f'  {column}: {count}')
+        click.echo(f'Report written to {report}')
+        return
+    
+    try:
+        result = import_file(path, has_headers=not no_headers, chunk_size=chunk_size, force=force,
+                             processes=current_app.config['IMPORT_PROCESSES'])
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    if result['skipped']:
+        click.echo(f'Already imported ({result["imported"]} records); use --force to import again')
+        return
+    if result['resumed_from']:
+        click.echo(f'Resumed after row {result["resumed_from"]}')
+    for skipped in result['skipped_sources']:
+        click.echo(f'Skipped {skipped}', err=True)
+    click.echo(f'Imported {result["imported"]} records ({result["inserted"]} new, '
+               f'{result["updated"]} updated, {result["unchanged"]} unchanged)')
+    for row_number, message in result['errors']:
+        click.echo(f'Row {row_number}: {message}', err=True)
+    if result['error_count']:
+        click.echo(f'Failed to import {result["error_count"]} records', err=True)
+
+@click.command('export-delta')
+@click.argument('consumer')
+@click.option('--since', default=None,
+              help='Acknowledge the watermark printed by the last run, once its output is saved.')
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default='ndjson', show_default=True)
+@click.option('-o', '--output', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='File to write (default: standard output).')
+@with_appcontext
+def export_delta_command(consumer, since, fmt, output):
+    """Export the records changed since CONSUMER's last acknowledged delta.
+
+    Once the output is saved, pass the printed watermark as --since on the next run.
+    """
+    try:
+        since, until, chunks = open_delta(consumer, fmt, current_app.config['EXPORT_BATCH_SIZE'],
+                                          current_app.config['EXPORT_DELTA_SETTLE_SECONDS'], since)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    with click.open_file(output or '-', 'w', encoding='utf-8') as out:
+        for chunk in chunks:
+            out.write(chunk)
+    click.echo(f'Changes from {since or "the beginning"} up to {until} exported for {consumer}', err=True)
+    click.echo(f'Once saved, acknowledge with --since "{until}"', err=True)
@@ -1,87 +1,74 @@
 from flask import (
     Blueprint, render_template, request, redirect, url_for, flash, 
-    current_app, send_file
+    current_app, send_file, jsonify, Response, stream_with_context
 )
 import sqlite3
 import os
-from datetime import datetime
 import re
-import tempfile
-import pandas as pd
-from ..models.db import get_db_connection, generate_patient_id
-from ..forms.forms import RecordForm, SearchForm, ImportForm
+from datetime import datetime
+from ..models.db import (
+    get_db, generate_patient_id, get_all_records, search_records, get_record_stats,
+    get_record_by_patient_id, get_job, update_job, get_import_checkpoint,
+    iter_records, count_records
+)
+from ..forms.forms import RecordForm, SearchForm, ImportForm, ExportForm
 from ..utils.excel_utils import initialize_excel_file, export_records_to_excel
+from ..utils.export_utils import (
+    iter_csv, iter_ndjson, columnar_available, export_records_to_columnar, open_delta
+)
+from ..utils.export_cache import export_cache_key, get_cached_export, store_cached_export
+from ..utils.import_utils import IMPORT_EXTENSIONS, file_digest, import_file, validate_file
+from ..utils.jobs import jobs
 import openpyxl
 
 # Create Blueprint
 main = Blueprint('main', __name__)
 
+# Names accepted for delta export consumers (?consumer=district-sis)
+CONSUMER_NAME = re.compile(r'[A-Za-z0-9_.-]{1,64}')
+
+def _per_page():
+    """Page size from the query string, bounded to keep responses small"""
+    per_page = request.args.get('per_page', type=int) or current_app.config['RECORDS_PER_PAGE']
+    return max(1, min(per_page, 100))
+
 @main.route('/', methods=['GET', 'POST'])
 def index():
-    """Home page displaying all records"""
+    """Home page displaying one page of records"""
     form = SearchForm()
-    conn = get_db_connection()
+    cursor = request.args.get('cursor')
+    search_term = None
     
     # If it's a search request, filter the records
     if form.validate_on_submit() or request.args.get('search_term'):
         search_term = form.search_term.data or request.args.get('search_term', '')
         form.search_term.data = search_term
-        
-        search_pattern = f"%{search_term}%"
-        # Use SELECT * to be compatible with older SQLite schemas
-        rows = conn.execute(
-            '''SELECT * FROM records 
-               WHERE full_name LIKE ? OR patient_id LIKE ? OR nurse_name LIKE ?
-               ORDER BY date_of_visit DESC, time_of_visit DESC''',
-            (search_pattern, search_pattern, search_pattern)
-        ).fetchall()
-        # Normalize visit_reason key for templates
-        records = []
-        for r in rows:
-            d = dict(r)
-            d['visit_reason'] = d.get('visit_reason') or d.get('visit_reason_category')
-            records.append(d)
+        page = search_records(search_term, cursor, _per_page())
     else:
-        # Default: get all records, normalize visit_reason
-        rows = conn.execute('''
-            SELECT * FROM records 
-            ORDER BY date_of_visit DESC, time_of_visit DESC
-        ''').fetchall()
-        records = []
-        for r in rows:
-            d = dict(r)
-            d['visit_reason'] = d.get('visit_reason') or d.get('visit_reason_category')
-            records.append(d)
+        # Default: newest records first
+        page = get_all_records(cursor, _per_page())
     
-    conn.close()
-    return render_template('index.html', records=records, form=form, title="School Nurse Health Log")
+    return render_template('index.html', records=page['items'], page=page, stats=get_record_stats(),
+                           search_term=search_term, form=form, export_form=ExportForm(formdata=None, q=search_term),
+                           columnar_export=columnar_available(), title="School Nurse Health Log")
 
 @main.route('/search', methods=['GET', 'POST'])
 def search():
     """Search for records"""
     form = SearchForm()
     records = []
+    page = None
+    search_term = None
     
     if form.validate_on_submit() or request.args.get('search_term'):
         search_term = form.search_term.data or request.args.get('search_term', '')
         form.search_term.data = search_term
         
-        conn = get_db_connection()
-        search_pattern = f"%{search_term}%"
-        rows = conn.execute(
-            '''SELECT * FROM records 
-               WHERE full_name LIKE ? OR patient_id LIKE ? OR nurse_name LIKE ?
-               ORDER BY date_of_visit DESC, time_of_visit DESC''', 
-            (search_pattern, search_pattern, search_pattern)
-        ).fetchall()
-        conn.close()
-        # Normalize visit_reason for template compatibility
-        for r in rows:
-            d = dict(r)
-            d['visit_reason'] = d.get('visit_reason') or d.get('visit_reason_category')
-            records.append(d)
+        page = search_records(search_term, request.args.get('cursor'), _per_page())
+        records = page['items']
     
-    return render_template('search.html', form=form, records=records, title="Search Records")
+    return render_template('search.html', form=form, records=records, page=page,
+                           search_term=search_term, title="Search Records")
 
 @main.route('/add', methods=['GET', 'POST'])
 def add_record():
@@ -89,13 +76,14 @@ def add_record():
     form = RecordForm()
     
     if form.validate_on_submit():
-        conn = get_db_connection()
+        conn = get_db()
         patient_id = generate_patient_id()
         
         # Format date and time objects to strings
         date_of_birth = form.date_of_birth.data.strftime('%Y-%m-%d') if form.date_of_birth.data else None
         date_of_visit = form.date_of_visit.data.strftime('%Y-%m-%d')
         time_of_visit = form.time_of_visit.data.strftime('%H:%M')
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         conn.execute(
             '''INSERT INTO records 
@@ -104,8 +92,8 @@ def add_record():
                 temperature, heart_rate, respiratory_rate, oxygen_saturation,
                 blood_pressure_systolic, blood_pressure_diastolic,
                 height, weight, bmi, pain_scale, pain_location,
-                notes, created_at)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                notes, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
             (
                 patient_id,
                 form.full_name.data,
@@ -130,11 +118,11 @@ def add_record():
                 (form.pain_level.data if hasattr(form, 'pain_level') else form.pain_scale.data),
                 form.pain_location.data,
                 form.notes.data,
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                current_time,
+                current_time
             )
         )
         conn.commit()
-        conn.close()
         
         flash(f'Record for {form.full_name.data} added successfully!', 'success')
         return redirect(url_for('main.index'))
@@ -144,16 +132,11 @@ def add_record():
 @main.route('/edit/<patient_id>', methods=['GET', 'POST'])
 def edit_record(patient_id):
     """Edit an existing health record"""
-    conn = get_db_connection()
-    record = conn.execute('SELECT * FROM records WHERE patient_id = ?', (patient_id,)).fetchone()
-    conn.close()
+    record = get_record_by_patient_id(patient_id)
     
     if record is None:
         flash('Record not found', 'danger')
         return redirect(url_for('main.index'))
-    
-    # Convert sqlite3.Row to dict for safe .get() access
-    record = dict(record)
 
     form = RecordForm()
     
@@ -195,7 +178,7 @@ def edit_record(patient_id):
         date_of_visit = form.date_of_visit.data.strftime('%Y-%m-%d')
         time_of_visit = form.time_of_visit.data.strftime('%H:%M')
         
-        conn = get_db_connection()
+        conn = get_db()
         conn.execute(
             '''UPDATE records SET 
                full_name = ?, date_of_birth = ?, age = ?, gender = ?, grade_level = ?, 
@@ -203,7 +186,7 @@ def edit_record(patient_id):
                visit_details = ?, temperature = ?, heart_rate = ?, respiratory_rate = ?, oxygen_saturation = ?,
                blood_pressure_systolic = ?, blood_pressure_diastolic = ?,
                height = ?, weight = ?, bmi = ?, pain_scale = ?, pain_location = ?,
-               notes = ? 
+               notes = ?, updated_at = ?
                WHERE patient_id = ?''',
             (
                 form.full_name.data, date_of_birth, form.age.data, form.gender.data, 
@@ -213,11 +196,10 @@ def edit_record(patient_id):
                 form.blood_pressure_systolic.data, form.blood_pressure_diastolic.data,
                 form.height.data, form.weight.data, form.bmi.data,
                 (form.pain_level.data if hasattr(form, 'pain_level') else form.pain_scale.data), form.pain_location.data,
-                form.notes.data, patient_id
+                form.notes.data, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), patient_id
             )
         )
         conn.commit()
-        conn.close()
         
         flash(f'Record for {form.full_name.data} updated successfully!', 'success')
         return redirect(url_for('main.index'))
@@ -227,7 +209,7 @@ def edit_record(patient_id):
 @main.route('/delete/<patient_id>', methods=['POST'])
 def delete_record(patient_id):
     """Delete a health record"""
-    conn = get_db_connection()
+    conn = get_db()
     record = conn.execute('SELECT full_name FROM records WHERE patient_id = ?', (patient_id,)).fetchone()
     
     if record:
@@ -237,253 +219,243 @@ def delete_record(patient_id):
     else:
         flash('Record not found', 'danger')
     
-    conn.close()
     return redirect(url_for('main.index'))
 
 @main.route('/view/<patient_id>')
 def view_record(patient_id):
     """View details of a health record"""
-    conn = get_db_connection()
-    record = conn.execute('SELECT * FROM records WHERE patient_id = ?', (patient_id,)).fetchone()
-    conn.close()
+    record = get_record_by_patient_id(patient_id)
     
     if record is None:
         flash('Record not found', 'danger')
         return redirect(url_for('main.index'))
     
-    # Normalize to dict and ensure template-friendly keys
-    record = dict(record)
-    record['visit_reason'] = record.get('visit_reason') or record.get('visit_reason_category')
     return render_template('view_record.html', record=record, title="View Health Record")
 
+def _export_filters():
+    """Validated export filters from the query string, or None after flashing the errors"""
+    form = ExportForm(request.args)
+    if not form.validate():
+        for errors in form.errors.values():
+            for error in errors:
+                flash(error, 'danger')
+        return None
+    return form.filters()
+
+def _start_export(fmt, func, *args):
+    """Serve the filtered export from the cache, or start ``func`` as a job that builds it"""
+    filters = _export_filters()
+    if filters is None:
+        return redirect(url_for('main.index'))
+    if not count_records(filters):
+        flash('No records match these filters' if filters else 'No records to export', 'warning')
+        return redirect(url_for('main.index'))
+    
+    cache_key = export_cache_key(fmt, filters)
+    cached = get_cached_export(cache_key, fmt)
+    if cached is not None:
+        return send_file(cached, as_attachment=True,
+                         download_name=f"nurse_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}")
+    
+    job_id = jobs.submit('export', func, *args, filters, cache_key)
+    return redirect(url_for('main.job_status', job_id=job_id))
+
 @main.route('/export')
 def export_to_excel():
-    """Export all health records to Excel"""
+    """Export the records matching the query-string filters to Excel in a background job"""
+    return _start_export('xlsx', _export_job)
+
+def _export_job(job, filters, cache_key):
+    """Job body: stream the filtered records into an .xlsx file in the job directory"""
+    job.progress(0, count_records(filters))
+    
+    filename = job.path('export.xlsx')
+    exported = 0
+    def progress(done):
+        nonlocal exported
+        exported = done
+        job.progress(done)
+    
+    records = iter_records(current_app.config['EXPORT_BATCH_SIZE'], filters)
+    if export_records_to_excel(records, filename, progress=progress) is None:
+        raise ValueError('No records to export')
+    store_cached_export(cache_key, 'xlsx', filename)
+    
+    return {
+        'exported': exported,
+        'filters': filters,
+        'file_path': filename,
+        'download_name': f"nurse_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+    }
+
+def _stream_export(generate, mimetype, extension):
+    """Stream the filtered records as a download, generated batch by batch from a cursor"""
+    filters = _export_filters()
+    if filters is None:
+        return redirect(url_for('main.index'))
+    
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    body = generate(iter_records(batch_size, filters), batch_size)
+    download_name = f"nurse_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return Response(
+        stream_with_context(body), mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+    )
+
+@main.route('/export.csv')
+def export_csv():
+    """Stream health records as CSV (no temp file, flat memory)"""
+    return _stream_export(iter_csv, 'text/csv', 'csv')
+
+@main.route('/export.ndjson')
+def export_ndjson():
+    """Stream health records as newline-delimited JSON"""
+    return _stream_export(iter_ndjson, 'application/x-ndjson', 'ndjson')
+
+@main.route('/export.<any(parquet, arrow):fmt>')
+def export_columnar(fmt):
+    """Export health records as typed Parquet or Arrow in a background job"""
+    if not columnar_available():
+        flash('Parquet and Arrow exports need the pyarrow package installed on the server', 'warning')
+        return redirect(url_for('main.index'))
+    return _start_export(fmt, _export_columnar_job, fmt)
+
+def _export_columnar_job(job, fmt, filters, cache_key):
+    """Job body: write the filtered records to a compressed columnar file in the job directory"""
+    job.progress(0, count_records(filters))
+    filename = job.path(f'export.{fmt}')
+    records = iter_records(current_app.config['EXPORT_BATCH_SIZE'], filters)
+    exported = export_records_to_columnar(records, filename, fmt, progress=job.progress)
+    store_cached_export(cache_key, fmt, filename)
+    
+    return {
+        'exported': exported,
+        'filters': filters,
+        'file_path': filename,
+        'download_name': f"nurse_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}",
+    }
+
+@main.route('/export/delta.<any(csv, ndjson):fmt>')
+def export_delta(fmt):
+    """Stream changes since the consumer's acknowledged watermark (``?since=`` acknowledges one)"""
+    consumer = request.args.get('consumer', '')
+    if not CONSUMER_NAME.fullmatch(consumer):
+        return jsonify({'error': 'consumer must be 1-64 letters, digits, ".", "_" or "-"'}), 400
+    
     try:
-        conn = get_db_connection()
-        records = conn.execute('SELECT * FROM records ORDER BY date_of_visit DESC, time_of_visit DESC').fetchall()
-        conn.close()
-        
-        if not records:
-            flash('No records to export', 'warning')
-            return redirect(url_for('main.index'))
-        
-        # Ensure we pass dictionaries to the Excel exporter (sqlite3.Row doesn't have .get)
-        records = [dict(r) for r in records]
-        
-        # Create a temporary file to store the Excel
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp:
-            filename = tmp.name
-        
-        # Use our utility function to export records
-        export_records_to_excel(records, filename)
-        
-        # Send the file to the user
-        return send_file(
-            filename,
-            as_attachment=True,
-            download_name=f"nurse_records_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        since, until, chunks = open_delta(
+            consumer, fmt, current_app.config['EXPORT_BATCH_SIZE'],
+            current_app.config['EXPORT_DELTA_SETTLE_SECONDS'], request.args.get('since')
         )
-    except Exception as e:
-        current_app.logger.exception("Export failed")
-        flash(f"Export failed: {str(e)}", 'danger')
-        return redirect(url_for('main.index'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    download_name = f"nurse_records_delta_{consumer}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={
+            'Content-Disposition': f'attachment; filename="{download_name}"',
+            'X-Export-Since': since or '',
+            'X-Export-Watermark': until,
+        }
+    )
 
 @main.route('/import', methods=['GET', 'POST'])
 def import_from_excel():
-    """Import health records from Excel"""
+    """Import health records from Excel, CSV or NDJSON in a background job"""
     form = ImportForm()
     
     if form.validate_on_submit():
-        try:
-            # Save the uploaded file temporarily
-            excel_file = request.files[form.excel_file.name]
-            filename = tempfile.mktemp(suffix='.xlsx')
-            excel_file.save(filename)
-            
-            # Read Excel into DataFrame
-            df = pd.read_excel(filename, header=0 if form.has_headers.data else None)
-            
-            # Clean up temporary file
-            os.unlink(filename)
-            
-            # Process DataFrame
-            if not form.has_headers.data:
-                # Create default column names if no headers
-                df.columns = [f'col_{i}' for i in range(len(df.columns))]
-            
-            # Map DataFrame columns to database fields
-            required_cols = ['full_name', 'date_of_visit', 'time_of_visit', 'nurse_name']
-            db_columns = {
-                'patient_id': None,
-                'full_name': None,
-                'date_of_birth': None,
-                'age': None,
-                'gender': None,
-                'grade_level': None,
-                'date_of_visit': None,
-                'time_of_visit': None,
-                'nurse_name': None,
-                # reason fields (support legacy and new)
-                'visit_reason': None,
-                'visit_reason_category': None,
-                'visit_details': None,
-                # vitals (support legacy pulse and new heart_rate)
-                'temperature': None,
-                'pulse': None,
-                'heart_rate': None,
-                'blood_pressure': None,  # combined like 120/80
-                # free text
-                'notes': None
-            }
-            
-            # Check if required columns exist in DataFrame
-            missing_cols = []
-            for col in df.columns:
-                # Normalize column name for matching
-                col_name = str(col).strip().lower().replace(' ', '_')
-                
-                # Map to database field if possible
-                for db_col in db_columns:
-                    if db_col in col_name or col_name in db_col:
-                        db_columns[db_col] = col
-                        break
-            
-            # Check for missing required columns
-            for req_col in required_cols:
-                if db_columns[req_col] is None:
-                    missing_cols.append(req_col)
-            
-            if missing_cols:
-                flash(f'Missing required columns: {", ".join(missing_cols)}', 'danger')
-                return render_template('import.html', form=form, title="Import Records")
-            
-            # Connect to database
-            conn = get_db_connection()
-            
-            # Process each row and insert into database
-            success_count = 0
-            error_count = 0
-            errors = []
-            
-            for _, row in df.iterrows():
-                try:
-                    # Generate a patient ID if not provided
-                    patient_id = str(row.get(db_columns['patient_id'], '')).strip() or generate_patient_id()
-                    
-                    # Format date fields
-                    date_of_birth = None
-                    if db_columns['date_of_birth'] is not None:
-                        try:
-                            dob = pd.to_datetime(row[db_columns['date_of_birth']])
-                            date_of_birth = dob.strftime('%Y-%m-%d')
-                        except:
-                            date_of_birth = None
-                    
-                    # Format visit date
-                    try:
-                        visit_date = pd.to_datetime(row[db_columns['date_of_visit']])
-                        date_of_visit = visit_date.strftime('%Y-%m-%d')
-                    except:
-                        error_count += 1
-                        errors.append(f"Row {success_count + error_count}: Invalid date format")
-                        continue
-                    
-                    # Format visit time
-                    try:
-                        time_value = row[db_columns['time_of_visit']]
-                        if isinstance(time_value, str):
-                            # Parse string time
-                            time_parts = time_value.strip().split(':')
-                            if len(time_parts) >= 2:
-                                time_of_visit = f"{time_parts[0].zfill(2)}:{time_parts[1].zfill(2)}"
-                            else:
-                                time_of_visit = "00:00"
-                        else:
-                            # Try to handle datetime objects
-                            try:
-                                visit_time = pd.to_datetime(time_value)
-                                time_of_visit = visit_time.strftime('%H:%M')
-                            except:
-                                time_of_visit = "00:00"
-                    except:
-                        time_of_visit = "00:00"
-                    
-                    # Extract other fields
-                    full_name = str(row[db_columns['full_name']]).strip()
-                    age = int(row[db_columns['age']]) if db_columns['age'] is not None and pd.notna(row[db_columns['age']]) else None
-                    gender = str(row[db_columns['gender']]) if db_columns['gender'] is not None and pd.notna(row[db_columns['gender']]) else None
-                    grade_level = str(row[db_columns['grade_level']]) if db_columns['grade_level'] is not None and pd.notna(row[db_columns['grade_level']]) else None
-                    nurse_name = str(row[db_columns['nurse_name']]).strip() if db_columns['nurse_name'] is not None else "Unknown"
-                    # Visit reason (prefer explicit visit_reason_category if present)
-                    visit_reason = None
-                    if db_columns['visit_reason_category'] is not None and pd.notna(row[db_columns['visit_reason_category']]):
-                        visit_reason = str(row[db_columns['visit_reason_category']])
-                    elif db_columns['visit_reason'] is not None and pd.notna(row[db_columns['visit_reason']]):
-                        visit_reason = str(row[db_columns['visit_reason']])
-                    visit_details = str(row[db_columns['visit_details']]) if db_columns['visit_details'] is not None and pd.notna(row[db_columns['visit_details']]) else None
-                    temperature = float(row[db_columns['temperature']]) if db_columns['temperature'] is not None and pd.notna(row[db_columns['temperature']]) else None
-                    # Heart rate from either 'heart_rate' or legacy 'pulse'
-                    hr = None
-                    if db_columns['heart_rate'] is not None and pd.notna(row[db_columns['heart_rate']]):
-                        try:
-                            hr = int(row[db_columns['heart_rate']])
-                        except:
-                            hr = None
-                    if hr is None and db_columns['pulse'] is not None and pd.notna(row[db_columns['pulse']]):
-                        try:
-                            hr = int(row[db_columns['pulse']])
-                        except:
-                            hr = None
-                    # Blood pressure: parse combined string like "120/80"
-                    bp_sys = None
-                    bp_dia = None
-                    if db_columns['blood_pressure'] is not None and pd.notna(row[db_columns['blood_pressure']]):
-                        try:
-                            bp_text = str(row[db_columns['blood_pressure']])
-                            parts = [p for p in re.split(r"[^0-9]", bp_text) if p.strip()]
-                            if len(parts) >= 2:
-                                bp_sys = int(parts[0])
-                                bp_dia = int(parts[1])
-                        except:
-                            bp_sys = None
-                            bp_dia = None
-                    notes = str(row[db_columns['notes']]) if db_columns['notes'] is not None and pd.notna(row[db_columns['notes']]) else None
-                    
-                    # Insert record into database
-                    conn.execute(
-                        '''INSERT OR REPLACE INTO records 
-                           (patient_id, full_name, date_of_birth, age, gender, grade_level, 
-                            date_of_visit, time_of_visit, nurse_name, visit_reason_category, visit_details,
-                            temperature, heart_rate, blood_pressure_systolic, blood_pressure_diastolic, notes, created_at) 
-                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                        (patient_id, full_name, date_of_birth, age, gender, grade_level, 
-                         date_of_visit, time_of_visit, nurse_name, visit_reason, visit_details,
-                         temperature, hr, bp_sys, bp_dia, notes, 
-                         datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
-                    )
-                    success_count += 1
-                except Exception as e:
-                    error_count += 1
-                    errors.append(f"Row {success_count + error_count}: {str(e)}")
-            
-            conn.commit()
-            conn.close()
-            
-            # Show results
-            if success_count > 0:
-                flash(f'Successfully imported {success_count} records', 'success')
-            if error_count > 0:
-                flash(f'Failed to import {error_count} records', 'warning')
-                for error in errors[:10]:  # Show first 10 errors
-                    flash(error, 'danger')
-                if len(errors) > 10:
-                    flash(f'... and {len(errors) - 10} more errors', 'danger')
-            
-            return redirect(url_for('main.index'))
-            
-        except Exception as e:
-            flash(f'Error importing Excel file: {str(e)}', 'danger')
+        # Keep the upload on disk; the request stream is gone once we return
+        upload = request.files[form.excel_file.name]
+        extension = os.path.splitext(upload.filename or '')[1].lower()
+        if extension not in IMPORT_EXTENSIONS:
+            flash(f'Unsupported file type "{extension or upload.filename}"', 'danger')
+            return render_template('import.html', form=form, title="Import Records")
+        
+        job = jobs.create('validate' if form.dry_run.data else 'import')
+        path = job.path(f'upload{extension}')
+        upload.save(path)
+        
+        if form.dry_run.data:
+            jobs.start(job, _validate_job, path, form.has_headers.data,
+                       current_app.config['IMPORT_CHUNK_SIZE'], upload.filename)
+            return redirect(url_for('main.job_status', job_id=job.id))
+        
+        # Files that already imported completely are skipped by content hash
+        file_hash = file_digest(path)
+        previous = get_import_checkpoint(file_hash)
+        if previous is not None and previous['status'] == 'complete' and not form.reimport.data:
+            os.remove(path)
+            update_job(job.id, status='done', result={
+                'skipped': True, 'imported': previous['imported'],
+                'error_count': previous['error_count'], 'errors': []
+            })
+            flash(f'This file was already imported on {previous["updated_at"]}; nothing to do', 'info')
+            return redirect(url_for('main.job_status', job_id=job.id))
+        
+        jobs.start(job, _import_job, path, form.has_headers.data,
+                   current_app.config['IMPORT_CHUNK_SIZE'], upload.filename, file_hash,
+                   form.reimport.data)
+        return redirect(url_for('main.job_status', job_id=job.id))
     
     return render_template('import.html', form=form, title="Import Records")
+
+def _import_job(job, path, has_headers, chunk_size, filename, file_hash, force):
+    """Job body: stream an uploaded file into the records table, checkpointing each chunk"""
+    try:
+        return import_file(path, has_headers, chunk_size, progress=job.progress, force=force,
+                           filename=filename, file_hash=file_hash,
+                           processes=current_app.config['IMPORT_PROCESSES'])
+    finally:
+        os.remove(path)
+
+def _validate_job(job, path, has_headers, chunk_size, filename):
+    """Job body: dry-run an uploaded file and write its error report"""
+    try:
+        result = validate_file(path, job.path('report.csv'), has_headers, chunk_size,
+                               progress=job.progress, filename=filename)
+    finally:
+        os.remove(path)
+    
+    result['file_path'] = job.path('report.csv')
+    result['download_name'] = f'{os.path.splitext(filename)[0]}_validation_report.csv'
+    return result
+
+@main.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Progress page for a background import or export"""
+    job = get_job(job_id)
+    if job is None:
+        flash('Job not found', 'danger')
+        return redirect(url_for('main.index'))
+    
+    return render_template('job.html', job=job, title="Job Status")
+
+@main.route('/jobs/<job_id>/status')
+def job_status_json(job_id):
+    """Job state as JSON for polling"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    job.pop('file_path')
+    job.pop('worker_pid')
+    job.pop('worker_started')
+    if job['status'] == 'done' and job['download_name']:
+        job['download_url'] = url_for('main.job_download', job_id=job_id)
+    return jsonify(job)
+
+@main.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    """Download the file produced by a finished job"""
+    job = get_job(job_id)
+    if job is None or job['status'] != 'done' or not job['file_path'] or not os.path.exists(job['file_path']):
+        flash('Download not available', 'danger')
+        return redirect(url_for('main.index'))
+    
+    return send_file(
+        job['file_path'],
+        as_attachment=True,
+        download_name=job['download_name']
+    )
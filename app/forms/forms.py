@@ -272,7 +272,47 @@ class SearchForm(FlaskForm):
     submit = SubmitField('Search')
 
 class ImportForm(FlaskForm):
-    """Form for importing records from Excel"""
-    excel_file = FileField('Excel File', validators=[DataRequired()])
+    """Form for importing records from Excel, CSV or NDJSON"""
+    excel_file = FileField('Data File', validators=[DataRequired()])
     has_headers = BooleanField('First row contains headers', default=True)
+    reimport = BooleanField('Import again even if this file was imported before', default=False)
+    dry_run = BooleanField('Validate only (dry run)', default=False)
     submit = SubmitField('Import Records')
+
+def _filter_choices(field, blank_label):
+    """A RecordForm select's choices with its placeholder replaced by an "any" option"""
+    return [('', blank_label)] + [choice for choice in field.kwargs['choices'] if choice[0]]
+
+class ExportForm(FlaskForm):
+    """Filters for exports, read from the query string (GET, no CSRF token)"""
+    date_from = DateField('Visits From', validators=[Optional()], format='%Y-%m-%d')
+    date_to = DateField('Visits To', validators=[Optional()], format='%Y-%m-%d')
+    # Any stored value may be passed in the URL, not only the form's choices
+    academic_term = SelectField('Academic Term', validators=[Optional()], validate_choice=False,
+                                choices=_filter_choices(RecordForm.academic_term, 'All terms'))
+    grade_level = SelectField('Grade/Year Level', validators=[Optional()], validate_choice=False,
+                              choices=_filter_choices(RecordForm.grade_level, 'All grades'))
+    visit_reason_category = SelectField('Visit Reason', validators=[Optional()], validate_choice=False,
+                                        choices=_filter_choices(RecordForm.visit_reason_category, 'All reasons'))
+    severity_level = SelectField('Severity Level', validators=[Optional()], validate_choice=False,
+                                 choices=_filter_choices(RecordForm.severity_level, 'All severities'))
+    q = StringField('Search Term', validators=[Optional(), Length(max=100)])
+
+    class Meta:
+        csrf = False
+
+    def validate_date_to(self, field):
+        if field.data and self.date_from.data and field.data < self.date_from.data:
+            raise ValidationError('End date must be on or after the start date.')
+
+    def filters(self):
+        """The filled-in filters as a dict for iter_records/count_records"""
+        filters = {}
+        for name in ('date_from', 'date_to'):
+            if self[name].data:
+                filters[name] = self[name].data.strftime('%Y-%m-%d')
+        for name in ('academic_term', 'grade_level', 'visit_reason_category', 'severity_level', 'q'):
+            value = (self[name].data or '').strip()
+            if value:
+                filters[name] = value
+        return filters
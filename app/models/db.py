@@ -1,22 +1,117 @@
 import os
+import re
+import base64
+import json
+import queue
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import random
 import string
+import uuid
+from itertools import islice
 import psycopg2
 from psycopg2.extras import DictCursor
-from flask import current_app
+from flask import current_app, g
+from markupsafe import Markup, escape
+from .record import HealthRecord, RecordSummary, LIST_COLUMNS, RECORD_COLUMNS
 
-def get_db_connection():
-    """Create and return a database connection (SQLite for all environments)."""
-    # Always use SQLite to keep schema and migrations consistent across envs.
-    # Render is configured with a persistent disk mounted at instance/.
-    db_file = current_app.config['DB_FILE']
+# Per-worker pools of ready-to-use connections, keyed by database file.
+# Each gunicorn worker is its own process, so the pid is part of the key to
+# avoid sharing sqlite handles across a fork.
+_pools = {}
+
+def _connect(db_file):
+    """Open a new SQLite connection with the per-connection PRAGMAs applied."""
     os.makedirs(os.path.dirname(db_file), exist_ok=True)
-    conn = sqlite3.connect(db_file)
+    # Connections are handed between request threads through the pool, but
+    # only ever used by one request at a time.
+    conn = sqlite3.connect(db_file, timeout=30, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA busy_timeout=30000')
+    conn.execute('PRAGMA temp_store=MEMORY')
     return conn
 
+class ConnectionPool:
+    """Small LIFO pool of pre-configured SQLite connections for one worker"""
+
+    def __init__(self, db_file, size=5):
+        self.db_file = db_file
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def acquire(self):
+        """Return an idle connection, opening a new one only if none is free"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _connect(self.db_file)
+
+    def release(self, conn):
+        """Hand a connection back to the pool, closing it if the pool is full"""
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection held by the pool"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+def get_pool():
+    """Return this worker's connection pool for the configured database"""
+    db_file = current_app.config['DB_FILE']
+    key = (os.getpid(), db_file)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = ConnectionPool(db_file, current_app.config.get('DB_POOL_SIZE', 5))
+    return pool
+
+def get_db():
+    """Return the request's connection, taken from the worker pool on first use"""
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+def close_db(e=None):
+    """Return the request's connection to the pool (app teardown handler)"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+def init_app(app):
+    """Register database lifecycle hooks on the Flask app"""
+    app.teardown_appcontext(close_db)
+
+# Text columns mirrored into the records_fts full-text index
+SEARCH_COLUMNS = (
+    'patient_id', 'full_name', 'nurse_name', 'presenting_complaints',
+    'other_complaint_details', 'complaint_background', 'nurse_observations', 'notes'
+)
+
+# Columns with per-value counters in record_stats (alongside the overall total)
+STAT_COLUMNS = ('date_of_visit', 'visit_reason_category', 'nurse_name')
+
+# Columns mirrored into the optional records_trigram substring index
+TRIGRAM_COLUMNS = ('patient_id', 'full_name')
+
+# Columns exports can filter on by exact value (see iter_records). Each has
+# an index led by the column and followed by the visit order, so a filtered
+# export reads only its slice, already sorted.
+EXPORT_FILTER_COLUMNS = ('academic_term', 'grade_level', 'visit_reason_category', 'severity_level')
+
+def get_db_connection():
+    """Create and return a standalone connection for scripts; request code uses ``get_db()``"""
+    # Always use SQLite to keep schema and migrations consistent across envs.
+    # Render is configured with a persistent disk mounted at instance/.
+    return _connect(current_app.config['DB_FILE'])
+
 def init_db():
     """Initialize the database with the required schema"""
     conn = get_db_connection()
@@ -48,6 +143,9 @@ def init_db():
             conn.commit()
         else:
             # Table exists but has the new schema, no migration needed
+            _ensure_schema_objects(cursor)
+            conn.commit()
+            conn.close()
             return
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS records (
@@ -161,6 +259,13 @@ def init_db():
         # Drop the old table
         cursor.execute('DROP TABLE old_records')
     
+    _ensure_schema_objects(cursor)
+    
+    conn.commit()
+    conn.close()
+
+def _ensure_schema_objects(cursor):
+    """Create indexes and support tables around records (idempotent, runs on every start)"""
     # Create an index on frequently queried fields
     cursor.execute('''
         CREATE INDEX IF NOT EXISTS idx_records_patient_id 
@@ -177,8 +282,267 @@ def init_db():
         ON records(date_of_visit)
     ''')
     
-    conn.commit()
-    conn.close()
+    # Covering index for the listings: the leading columns match the listing
+    # order (serving keyset pagination), the rest are the list projection.
+    # It supersedes the narrower idx_records_visit_order.
+    cursor.execute('DROP INDEX IF EXISTS idx_records_visit_order')
+    cursor.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_records_list 
+        ON records(date_of_visit DESC, time_of_visit DESC, id DESC,
+                   {', '.join(c for c in LIST_COLUMNS if c not in ('id', 'date_of_visit', 'time_of_visit'))})
+    ''')
+    
+    for column in EXPORT_FILTER_COLUMNS:
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_records_{column}
+            ON records({column}, date_of_visit DESC, time_of_visit DESC)
+        ''')
+    
+    _ensure_search_index(cursor)
+    _ensure_stats_table(cursor)
+    _ensure_jobs_table(cursor)
+    _ensure_import_checkpoints_table(cursor)
+    _ensure_delta_export_tables(cursor)
+    _ensure_data_version_table(cursor)
+
+def _ensure_stats_table(cursor):
+    """Create record_stats (total and per-value STAT_COLUMNS counts) and the triggers that maintain it"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='record_stats'")
+    if cursor.fetchone() is None:
+        cursor.execute('''
+            CREATE TABLE record_stats (
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, value)
+            ) WITHOUT ROWID
+        ''')
+        # Seed the counters from rows that predate the table
+        cursor.execute("""
+            INSERT INTO record_stats (dimension, value, count)
+            SELECT 'total', '', COUNT(*) FROM records
+        """)
+        for col in STAT_COLUMNS:
+            cursor.execute(f'''
+                INSERT INTO record_stats (dimension, value, count)
+                SELECT '{col}', COALESCE({col}, ''), COUNT(*) FROM records
+                GROUP BY COALESCE({col}, '')
+            ''')
+    
+    def bump(row, delta):
+        keys = [("'total'", "''")] + [(f"'{col}'", f"COALESCE({row}.{col}, '')") for col in STAT_COLUMNS]
+        return '\n'.join(
+            f'''INSERT INTO record_stats (dimension, value, count) VALUES ({dim}, {value}, {delta})
+                ON CONFLICT (dimension, value) DO UPDATE SET count = count + ({delta});'''
+            for dim, value in keys
+        )
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS record_stats_ai AFTER INSERT ON records BEGIN
+            {bump('new', 1)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS record_stats_ad AFTER DELETE ON records BEGIN
+            {bump('old', -1)}
+            DELETE FROM record_stats WHERE count <= 0 AND dimension != 'total';
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS record_stats_au AFTER UPDATE OF {', '.join(STAT_COLUMNS)} ON records BEGIN
+            {bump('old', -1)}
+            {bump('new', 1)}
+            DELETE FROM record_stats WHERE count <= 0 AND dimension != 'total';
+        END
+    ''')
+
+def _ensure_jobs_table(cursor):
+    """Create the jobs table, failing jobs left behind by worker processes that are gone"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,  -- import / export
+            status TEXT NOT NULL DEFAULT 'queued',  -- queued / running / done / failed
+            progress INTEGER NOT NULL DEFAULT 0,  -- rows processed so far
+            total INTEGER,  -- rows expected, when known
+            message TEXT,
+            result TEXT,  -- JSON summary
+            file_path TEXT,  -- finished output offered for download
+            download_name TEXT,
+            worker_pid INTEGER,
+            worker_started TEXT,  -- start time of worker_pid, telling a reused pid apart
+            created_at TEXT,
+            updated_at TEXT
+        )
+    ''')
+    if 'worker_started' not in [col[1] for col in cursor.execute('PRAGMA table_info(jobs)')]:
+        cursor.execute('ALTER TABLE jobs ADD COLUMN worker_started TEXT')
+    
+    # This process has not started any jobs yet, so one carrying its pid is a
+    # leftover from before a restart that handed out the same pid
+    rows = cursor.execute(
+        "SELECT id, worker_pid, worker_started FROM jobs WHERE status IN ('queued', 'running')"
+    ).fetchall()
+    orphaned = [
+        (row[0],) for row in rows
+        if row[1] == os.getpid() or not _pid_alive(row[1])
+        or (row[2] is not None and row[2] != _process_started(row[1]))
+    ]
+    if orphaned:
+        cursor.executemany(
+            "UPDATE jobs SET status = 'failed', message = 'Interrupted by a server restart' WHERE id = ?",
+            orphaned
+        )
+
+def _ensure_import_checkpoints_table(cursor):
+    """Create import_checkpoints: progress of each imported file, keyed by content hash"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_checkpoints (
+            file_hash TEXT PRIMARY KEY,  -- sha256 of the file contents
+            filename TEXT,
+            last_row INTEGER NOT NULL DEFAULT 0,  -- last source row committed
+            imported INTEGER NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'partial',  -- partial / complete
+            created_at TEXT,
+            updated_at TEXT
+        )
+    ''')
+
+def _ensure_delta_export_tables(cursor):
+    """Create the consumer, tombstone and index bookkeeping behind delta exports"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS export_consumers (
+            name TEXT PRIMARY KEY,
+            watermark TEXT,  -- acknowledged updated_at high-water mark; NULL until the first ack
+            exported INTEGER NOT NULL DEFAULT 0,  -- rows sent by the last delta
+            created_at TEXT,
+            updated_at TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS record_tombstones (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            record_id INTEGER NOT NULL,
+            patient_id TEXT,
+            deleted_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_record_tombstones_deleted_at
+        ON record_tombstones(deleted_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_records_updated_at
+        ON records(updated_at)
+    ''')
+    # Stamped in the same local-time format the app writes into updated_at
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS records_tombstone AFTER DELETE ON records
+        WHEN EXISTS (SELECT 1 FROM export_consumers)
+        BEGIN
+            INSERT INTO record_tombstones (record_id, patient_id, deleted_at)
+            VALUES (old.id, old.patient_id, strftime('%Y-%m-%d %H:%M:%S', 'now', 'localtime'));
+        END
+    ''')
+
+def _ensure_data_version_table(cursor):
+    """Create records_version, a change counter bumped by triggers on records (keys the export cache)"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS records_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            instance TEXT NOT NULL,
+            version INTEGER NOT NULL
+        )
+    ''')
+    # PRAGMA data_version is per connection and restarts on reconnect; the
+    # random instance id keeps a recreated or restored database from reusing keys
+    cursor.execute(
+        'INSERT OR IGNORE INTO records_version (id, instance, version) VALUES (1, ?, 0)',
+        (uuid.uuid4().hex,)
+    )
+    for suffix, event in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE')):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS records_version_{suffix} AFTER {event} ON records BEGIN
+                UPDATE records_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+def _pid_alive(pid):
+    """True if a process with this pid is running on this host"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _process_started(pid):
+    """Start time of a process (clock ticks since boot) from /proc, or None where unavailable"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # Fields after the parenthesized command name; starttime is field 22
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+def _create_content_index(cursor, table, columns, tokenize):
+    """Create an external-content FTS5 table over records with its sync triggers; False if unsupported"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,))
+    if cursor.fetchone() is None:
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE {table} USING fts5(
+                    {', '.join(columns)},
+                    content='records', content_rowid='id',
+                    tokenize='{tokenize}'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            return False
+        # Index any rows that predate the FTS table
+        cursor.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+    
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{col}' for col in columns)
+    old_values = ', '.join(f'old.{col}' for col in columns)
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON records BEGIN
+            INSERT INTO {table}(rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON records BEGIN
+            INSERT INTO {table}({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    # Only re-index when an indexed column actually changes
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {column_list} ON records BEGIN
+            INSERT INTO {table}({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {table}(rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    ''')
+    return True
+
+def _drop_content_index(cursor, table):
+    """Drop an FTS5 table created by _create_content_index together with its triggers"""
+    for suffix in ('ai', 'ad', 'au'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {table}_{suffix}')
+    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+def _ensure_search_index(cursor):
+    """Create the records_fts index and, if enabled, the trigram index"""
+    _create_content_index(cursor, 'records_fts', SEARCH_COLUMNS, 'unicode61 remove_diacritics 2')
+    
+    # Trigram index for substring matches inside IDs and names (SQLite >= 3.34)
+    if current_app.config.get('SEARCH_TRIGRAM_INDEX', True):
+        _create_content_index(cursor, 'records_trigram', TRIGRAM_COLUMNS, 'trigram')
+    else:
+        _drop_content_index(cursor, 'records_trigram')
 
 def generate_patient_id():
     """Generate a unique patient ID with format: YYYYMMDD-XXXX"""
@@ -188,7 +552,7 @@ def generate_patient_id():
 
 def create_record(record_data):
     """Create a new health record in the database"""
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     
     # Generate a new patient ID if not provided
@@ -215,37 +579,297 @@ def create_record(record_data):
     except Exception as e:
         conn.rollback()
         raise e
-    finally:
-        conn.close()
+
+def chunked(iterable, size):
+    """Yield lists of up to ``size`` items from any iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _fetch_rows(db_cursor, batch_size):
+    """Yield an executed cursor's rows, ``batch_size`` per fetch"""
+    for rows in iter(lambda: db_cursor.fetchmany(batch_size), []):
+        yield from rows
+
+def _lookup_ids(conn, patient_ids):
+    """Map patient IDs to row ids, querying in chunks below SQLite's variable limit"""
+    found = {}
+    for chunk in chunked(patient_ids, 500):
+        placeholders = ', '.join(['?'] * len(chunk))
+        rows = conn.execute(
+            f'SELECT patient_id, id FROM records WHERE patient_id IN ({placeholders})', chunk
+        ).fetchall()
+        found.update((row[0], row[1]) for row in rows)
+    return found
+
+def _assign_patient_ids(conn, batch, taken):
+    """Fill in missing patient IDs, avoiding IDs already used in this load or the table"""
+    pending = [record for record in batch if not record.get('patient_id')]
+    while pending:
+        for record in pending:
+            patient_id = generate_patient_id()
+            while patient_id in taken:
+                patient_id = generate_patient_id()
+            record['patient_id'] = patient_id
+            taken.add(patient_id)
+        existing = _lookup_ids(conn, [record['patient_id'] for record in pending])
+        pending = [record for record in pending if record['patient_id'] in existing]
+
+def create_records(records, batch_size=500):
+    """Bulk-insert records, one transaction per batch, and return their ids in input order"""
+    conn = get_db()
+    taken = set()
+    ids = []
+    
+    for chunk in chunked(records, batch_size):
+        # Stamped per batch, like merge_records per chunk, so each commit carries its own time
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        batch = []
+        for record_data in chunk:
+            record = dict(record_data)
+            record.setdefault('created_at', current_time)
+            record.setdefault('updated_at', current_time)
+            batch.append(record)
+        _assign_patient_ids(conn, batch, taken)
+        taken.update(record['patient_id'] for record in batch)
+        
+        # One prepared statement per distinct column set
+        groups = {}
+        for record in batch:
+            groups.setdefault(tuple(record), []).append(record)
+        
+        try:
+            for columns, rows in groups.items():
+                placeholders = ', '.join(['?'] * len(columns))
+                conn.executemany(
+                    f'INSERT INTO records ({", ".join(columns)}) VALUES ({placeholders})',
+                    [tuple(row[col] for col in columns) for row in rows]
+                )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        
+        found = _lookup_ids(conn, [record['patient_id'] for record in batch])
+        ids.extend(found.get(record['patient_id']) for record in batch)
+    
+    return ids
+
+def create_job(kind):
+    """Record a new queued job and return its id"""
+    conn = get_db()
+    job_id = uuid.uuid4().hex
+    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn.execute(
+        'INSERT INTO jobs (id, kind, worker_pid, worker_started, created_at, updated_at) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (job_id, kind, os.getpid(), _process_started(os.getpid()), current_time, current_time)
+    )
+    conn.commit()
+    return job_id
+
+def update_job(job_id, **fields):
+    """Update a job's columns; ``result`` is stored as JSON"""
+    if 'result' in fields:
+        fields['result'] = json.dumps(fields['result'])
+    fields['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    conn = get_db()
+    assignments = ', '.join(f'{name} = ?' for name in fields)
+    conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+    conn.commit()
+
+def get_job(job_id):
+    """Return a job as a dict (``result`` decoded), or None"""
+    row = get_db().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job['result'] = json.loads(job['result']) if job['result'] else {}
+    return job
+
+def merge_records(records, checkpoint=None):
+    """Upsert records by patient_id in one transaction; returns inserted/updated/unchanged counts"""
+    records = list(records)
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    if not records:
+        return counts
+    
+    conn = get_db()
+    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    try:
+        _assign_patient_ids(conn, records, set())
+        columns = tuple(records[0])
+        column_list = ', '.join(columns)
+        placeholders = ', '.join(['?'] * len(columns))
+        updates = [col for col in columns if col != 'patient_id']
+        
+        # Same column affinities as records, rebuilt per batch because the
+        # mapped columns differ between imports sharing a pooled connection
+        conn.execute('DROP TABLE IF EXISTS temp.import_staging')
+        conn.execute(f'CREATE TEMP TABLE import_staging AS SELECT {column_list} FROM records WHERE 0')
+        conn.executemany(
+            f'INSERT INTO import_staging ({column_list}) VALUES ({placeholders})',
+            [tuple(record[col] for col in columns) for record in records]
+        )
+        existing = conn.execute(
+            'SELECT COUNT(*) FROM import_staging WHERE patient_id IN (SELECT patient_id FROM records)'
+        ).fetchone()[0]
+        
+        # "WHERE true" disambiguates the upsert clause from a join condition
+        cursor = conn.execute(f'''
+            INSERT INTO records ({column_list}, created_at, updated_at)
+            SELECT {column_list}, ?, ? FROM import_staging WHERE true
+            ON CONFLICT (patient_id) DO UPDATE SET
+                {', '.join(f'{col} = excluded.{col}' for col in updates)},
+                updated_at = excluded.updated_at
+            WHERE {' OR '.join(f'records.{col} IS NOT excluded.{col}' for col in updates)}
+        ''', (current_time, current_time))
+        written = cursor.rowcount
+        conn.execute('DROP TABLE temp.import_staging')
+        # The checkpoint commits with these rows or not at all
+        if checkpoint is not None:
+            checkpoint()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise e
+    
+    counts['inserted'] = len(records) - existing
+    counts['updated'] = written - counts['inserted']
+    counts['unchanged'] = existing - counts['updated']
+    return counts
+
+def get_import_checkpoint(file_hash):
+    """Return the checkpoint row for a file hash, or None"""
+    return get_db().execute(
+        'SELECT * FROM import_checkpoints WHERE file_hash = ?', (file_hash,)
+    ).fetchone()
+
+def save_import_checkpoint(file_hash, filename, last_row, imported, error_count,
+                           status='partial', commit=True):
+    """Record how far a file's import got; ``commit=False`` joins the open transaction"""
+    conn = get_db()
+    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn.execute('''
+        INSERT INTO import_checkpoints
+            (file_hash, filename, last_row, imported, error_count, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (file_hash) DO UPDATE SET
+            filename = excluded.filename, last_row = excluded.last_row,
+            imported = excluded.imported, error_count = excluded.error_count,
+            status = excluded.status, updated_at = excluded.updated_at
+    ''', (file_hash, filename, last_row, imported, error_count, status, current_time, current_time))
+    if commit:
+        conn.commit()
+
+def begin_delta_export(consumer, settle_seconds=5, acknowledged=None):
+    """Return a consumer's ``(since, until)`` window, first advancing its watermark to ``acknowledged``"""
+    conn = get_db()
+    now = datetime.now()
+    current_time = now.strftime('%Y-%m-%d %H:%M:%S')
+    # Lag the clock so writes still committing fall into the next window
+    until = (now - timedelta(seconds=settle_seconds)).strftime('%Y-%m-%d %H:%M:%S')
+    # Registered up front so deletions from here on leave tombstones
+    conn.execute(
+        'INSERT INTO export_consumers (name, created_at, updated_at) VALUES (?, ?, ?) '
+        'ON CONFLICT (name) DO NOTHING',
+        (consumer, current_time, current_time)
+    )
+    conn.commit()
+    since = conn.execute('SELECT watermark FROM export_consumers WHERE name = ?', (consumer,)).fetchone()[0]
+    # Only an acknowledgment moves the watermark, so an unsaved delta is sent again
+    if acknowledged is not None and acknowledged != since:
+        try:
+            datetime.strptime(acknowledged, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            raise ValueError(f'Invalid watermark "{acknowledged}" (expected YYYY-MM-DD HH:MM:SS)')
+        if since is not None and acknowledged < since:
+            raise ValueError(f'Watermark {acknowledged} is older than the acknowledged {since}')
+        if acknowledged > until:
+            raise ValueError(f'Watermark {acknowledged} has not been issued yet')
+        save_export_watermark(consumer, acknowledged)
+        since = acknowledged
+    if since is not None and since > until:
+        until = since
+    return since, until
+
+def iter_changed_records(since, until, batch_size=1000):
+    """Yield records updated in ``[since, until)`` (all when ``since`` is None) as RECORD_COLUMNS tuples"""
+    conn = get_db()
+    if since is None:
+        where, params = '(updated_at < ? OR updated_at IS NULL)', (until,)
+    else:
+        where, params = 'updated_at >= ? AND updated_at < ?', (since, until)
+    db_cursor = conn.cursor()
+    db_cursor.row_factory = None
+    db_cursor.execute(f'''
+        SELECT {', '.join(RECORD_COLUMNS)} FROM records
+        WHERE {where}
+        ORDER BY updated_at, id
+    ''', params)
+    yield from _fetch_rows(db_cursor, batch_size)
+
+def get_tombstones(since, until):
+    """Return ``(patient_id, deleted_at)`` rows for records deleted in ``[since, until)``"""
+    if since is None:
+        # A first export is a full snapshot; there is nothing to delete yet
+        return []
+    return get_db().execute('''
+        SELECT patient_id, deleted_at FROM record_tombstones
+        WHERE deleted_at >= ? AND deleted_at < ?
+        ORDER BY deleted_at, id
+    ''', (since, until)).fetchall()
+
+def save_export_watermark(consumer, watermark):
+    """Advance a consumer's acknowledged watermark and prune tombstones every consumer has passed"""
+    conn = get_db()
+    conn.execute(
+        'UPDATE export_consumers SET watermark = ?, updated_at = ? WHERE name = ?',
+        (watermark, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), consumer)
+    )
+    conn.execute('''
+        DELETE FROM record_tombstones
+        WHERE deleted_at < (SELECT MIN(COALESCE(watermark, '')) FROM export_consumers)
+    ''')
+    conn.commit()
+
+def save_export_count(consumer, exported):
+    """Record how many rows the consumer's latest delta sent"""
+    conn = get_db()
+    conn.execute('UPDATE export_consumers SET exported = ? WHERE name = ?', (exported, consumer))
+    conn.commit()
 
 def get_record_by_id(record_id):
     """Retrieve a health record by its ID"""
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     
     cursor.execute('SELECT * FROM records WHERE id = ?', (record_id,))
     record = cursor.fetchone()
-    conn.close()
     
-    return dict(record) if record else None
+    return HealthRecord.from_row(record)
 
 def get_record_by_patient_id(patient_id):
     """Retrieve a health record by patient ID"""
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     
     cursor.execute('SELECT * FROM records WHERE patient_id = ?', (patient_id,))
     record = cursor.fetchone()
-    conn.close()
     
-    return dict(record) if record else None
+    return HealthRecord.from_row(record)
 
 def update_record(record_id, update_data):
     """Update an existing health record"""
     if not update_data:
         return get_record_by_id(record_id)
     
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     
     # Update the timestamp
@@ -266,12 +890,10 @@ def update_record(record_id, update_data):
     except Exception as e:
         conn.rollback()
         raise e
-    finally:
-        conn.close()
 
 def delete_record(record_id):
     """Delete a health record"""
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
     
     try:
@@ -281,73 +903,254 @@ def delete_record(record_id):
     except Exception as e:
         conn.rollback()
         raise e
-    finally:
-        conn.close()
 
-def search_records(search_term, page=1, per_page=20):
-    """Search health records with pagination"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    offset = (page - 1) * per_page
-    search_pattern = f'%{search_term}%'
+def encode_cursor(key, direction='next'):
+    """Encode a sort key into an opaque, URL-safe page cursor"""
+    payload = json.dumps({'d': direction, 'k': list(key)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, key_length=3):
+    """Decode a page cursor into (direction, sort key); raises ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        direction, key = payload['d'], payload['k']
+    except Exception as e:
+        raise ValueError(f'Invalid page cursor: {cursor!r}') from e
+    if direction not in ('next', 'prev') or len(key) != key_length:
+        raise ValueError(f'Invalid page cursor: {cursor!r}')
+    return direction, tuple(key)
+
+def _visit_order_key(record):
+    """Sort key used by the date-ordered listings"""
+    return (record.date_of_visit, record.time_of_visit, record.id)
+
+def _keyset_page(cursor, where, params, page_cursor=None, per_page=20):
+    """Fetch one page ordered by (date_of_visit, time_of_visit, id) DESC, seeking past ``page_cursor``"""
+    direction, key = 'next', None
+    if page_cursor:
+        try:
+            direction, key = decode_cursor(page_cursor)
+        except ValueError:
+            # Stale or tampered cursor: fall back to the first page
+            direction, key = 'next', None
     
-    # Count total matching records
-    cursor.execute('''
-        SELECT COUNT(*) FROM records 
-        WHERE full_name LIKE ? 
-        OR patient_id LIKE ?
-        OR nurse_name LIKE ?
-    ''', (search_pattern, search_pattern, search_pattern))
+    conditions = [where] if where else []
+    seek_params = list(params)
+    if key is not None:
+        op = '<' if direction == 'next' else '>'
+        conditions.append(f'(date_of_visit, time_of_visit, id) {op} (?, ?, ?)')
+        seek_params.extend(key)
+    order = 'DESC' if direction == 'next' else 'ASC'
+    where_sql = f"WHERE {' AND '.join(conditions)}" if conditions else ''
     
-    total = cursor.fetchone()[0]
+    cursor.execute(f'''
+        SELECT {', '.join(LIST_COLUMNS)} FROM records 
+        {where_sql}
+        ORDER BY date_of_visit {order}, time_of_visit {order}, id {order}
+        LIMIT ?
+    ''', seek_params + [per_page + 1])
     
-    # Get paginated results
-    cursor.execute('''
-        SELECT * FROM records 
-        WHERE full_name LIKE ? 
-        OR patient_id LIKE ?
-        OR nurse_name LIKE ?
-        ORDER BY date_of_visit DESC, time_of_visit DESC
-        LIMIT ? OFFSET ?
-    ''', (search_pattern, search_pattern, search_pattern, per_page, offset))
+    rows = cursor.fetchall()
+    return _page_result(rows, direction, key is not None, per_page, _visit_order_key)
+
+def _page_result(rows, direction, had_cursor, per_page, key_fn):
+    """Build a page dict of RecordSummary items plus next/prev cursors from up to per_page + 1 rows"""
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if direction == 'prev':
+        rows.reverse()
+    records = [RecordSummary(*row) for row in rows]
     
-    records = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    if direction == 'next':
+        has_next, has_prev = has_more, had_cursor
+    else:
+        has_next, has_prev = True, has_more
     
     return {
         'items': records,
-        'total': total,
-        'page': page,
         'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        'has_next': bool(records) and has_next,
+        'has_prev': bool(records) and has_prev,
+        'next_cursor': encode_cursor(key_fn(records[-1]), 'next') if records and has_next else None,
+        'prev_cursor': encode_cursor(key_fn(records[0]), 'prev') if records and has_prev else None
     }
 
-def get_all_records(page=1, per_page=20):
-    """Get all health records with pagination"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def _fts_query(search_term):
+    """Turn free text into an FTS5 query where every word must match as a prefix"""
+    tokens = re.findall(r'\w+', search_term or '')
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def _has_search_index(conn, table='records_fts'):
+    """Whether the given full-text index exists in this database"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    ).fetchone() is not None
+
+def _highlight(snippet):
+    """Escape an FTS snippet and turn its match markers into <mark> tags"""
+    if not snippet:
+        return None
+    html = str(escape(snippet)).replace('\x02', '<mark>').replace('\x03', '</mark>')
+    return Markup(html)
+
+def _ranked_search_page(cursor, match, page_cursor=None, per_page=20):
+    """Fetch one page of full-text matches, best bm25 score first, seeking on (score, id)"""
+    direction, key = 'next', None
+    if page_cursor:
+        try:
+            direction, key = decode_cursor(page_cursor, key_length=2)
+        except ValueError:
+            direction, key = 'next', None
     
-    offset = (page - 1) * per_page
+    conditions = ['records_fts MATCH ?']
+    params = [match]
+    if key is not None:
+        op = '>' if direction == 'next' else '<'
+        conditions.append(f'(bm25(records_fts), records_fts.rowid) {op} (?, ?)')
+        params.extend(key)
+    order = 'ASC' if direction == 'next' else 'DESC'
     
-    # Count total records
-    cursor.execute('SELECT COUNT(*) FROM records')
-    total = cursor.fetchone()[0]
+    cursor.execute(f'''
+        SELECT {', '.join(f'records.{col}' for col in LIST_COLUMNS)}, bm25(records_fts) AS score,
+               snippet(records_fts, -1, char(2), char(3), '…', 12) AS snippet
+        FROM records_fts JOIN records ON records.id = records_fts.rowid
+        WHERE {' AND '.join(conditions)}
+        ORDER BY score {order}, records.id {order}
+        LIMIT ?
+    ''', params + [per_page + 1])
     
-    # Get paginated results
-    cursor.execute('''
-        SELECT * FROM records 
-        ORDER BY date_of_visit DESC, time_of_visit DESC
-        LIMIT ? OFFSET ?
-    ''', (per_page, offset))
+    result = _page_result(cursor.fetchall(), direction, key is not None, per_page,
+                          lambda record: (record.score, record.id))
+    result['items'] = [record._replace(snippet=_highlight(record.snippet)) for record in result['items']]
+    return result
+
+def search_records(search_term, cursor=None, per_page=20):
+    """Search health records with cursor pagination: ranked full-text matches, else substring matches"""
+    conn = get_db()
+    db_cursor = conn.cursor()
+    count_limit = current_app.config.get('SEARCH_COUNT_LIMIT', 1000)
     
-    records = [dict(row) for row in cursor.fetchall()]
-    conn.close()
+    match = _fts_query(search_term)
+    if match and _has_search_index(conn):
+        total, capped = _count_capped(db_cursor, 'records_fts WHERE records_fts MATCH ?', (match,), count_limit)
+        if total:
+            result = _ranked_search_page(db_cursor, match, cursor, per_page)
+            result.update(total=total, total_capped=capped)
+            return result
     
+    # No whole-word hits: try a substring match on IDs and names
+    where, params = _substring_condition(conn, search_term)
+    total, capped = _count_capped(db_cursor, f'records WHERE {where}', params, count_limit)
+    result = _keyset_page(db_cursor, where, params, cursor, per_page)
+    result.update(total=total, total_capped=capped)
+    return result
+
+def _substring_condition(conn, search_term):
+    """``(where, params)`` matching a substring of IDs and names, via records_trigram or LIKE"""
+    term = (search_term or '').strip()
+    if len(term) >= 3 and _has_search_index(conn, 'records_trigram'):
+        where = 'id IN (SELECT rowid FROM records_trigram WHERE records_trigram MATCH ?)'
+        return where, ('"' + term.replace('"', '""') + '"',)
+    search_pattern = f'%{search_term}%'
+    where = '(full_name LIKE ? OR patient_id LIKE ? OR nurse_name LIKE ?)'
+    return where, (search_pattern, search_pattern, search_pattern)
+
+def _search_condition(conn, search_term):
+    """``(where, params)`` selecting the records ``search_records`` finds for a term"""
+    match = _fts_query(search_term)
+    if match and _has_search_index(conn):
+        hit = conn.execute(
+            'SELECT 1 FROM records_fts WHERE records_fts MATCH ? LIMIT 1', (match,)
+        ).fetchone()
+        if hit:
+            return 'id IN (SELECT rowid FROM records_fts WHERE records_fts MATCH ?)', (match,)
+    return _substring_condition(conn, search_term)
+
+def _count_capped(cursor, from_where, params, limit):
+    """Count matching rows up to ``limit``; returns (count, capped)"""
+    cursor.execute(
+        f'SELECT COUNT(*) FROM (SELECT 1 FROM {from_where} LIMIT ?)',
+        tuple(params) + (limit + 1,)
+    )
+    count = cursor.fetchone()[0]
+    return min(count, limit), count > limit
+
+def get_stat_counts(dimension):
+    """Return {value: count} for one of STAT_COLUMNS from record_stats (NULL counted as '')"""
+    conn = get_db()
+    rows = conn.execute(
+        'SELECT value, count FROM record_stats WHERE dimension = ?', (dimension,)
+    ).fetchall()
+    return {row['value']: row['count'] for row in rows}
+
+def get_data_version():
+    """Token that changes whenever records change: "<instance>:<version>" (see records_version)"""
+    row = get_db().execute('SELECT instance, version FROM records_version WHERE id = 1').fetchone()
+    return f"{row['instance']}:{row['version']}" if row else ''
+
+def get_total_records():
+    """Return the number of records in O(1) from the trigger-maintained counter"""
+    conn = get_db()
+    row = conn.execute(
+        "SELECT count FROM record_stats WHERE dimension = 'total' AND value = ''"
+    ).fetchone()
+    return row['count'] if row else 0
+
+def get_record_stats():
+    """Return the total record count and the count per visit reason category"""
     return {
-        'items': records,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        'total': get_total_records(),
+        'by_reason': get_stat_counts('visit_reason_category')
     }
+
+def _filter_condition(conn, filters):
+    """``(where or None, params)`` for export filters: date range, EXPORT_FILTER_COLUMNS and ``q``"""
+    filters = filters or {}
+    conditions, params = [], []
+    if filters.get('date_from'):
+        conditions.append('date_of_visit >= ?')
+        params.append(filters['date_from'])
+    if filters.get('date_to'):
+        conditions.append('date_of_visit <= ?')
+        params.append(filters['date_to'])
+    for column in EXPORT_FILTER_COLUMNS:
+        if filters.get(column):
+            conditions.append(f'{column} = ?')
+            params.append(filters[column])
+    if filters.get('q'):
+        where, search_params = _search_condition(conn, filters['q'])
+        conditions.append(where)
+        params.extend(search_params)
+    return (' AND '.join(conditions) or None), params
+
+def count_records(filters=None):
+    """Number of records matching export ``filters`` (see iter_records)"""
+    conn = get_db()
+    where, params = _filter_condition(conn, filters)
+    if where is None:
+        return get_total_records()
+    return conn.execute(f'SELECT COUNT(*) FROM records WHERE {where}', params).fetchone()[0]
+
+def iter_records(batch_size=1000, filters=None):
+    """Yield filtered records as RECORD_COLUMNS tuples, newest visit first, ``batch_size`` per fetch"""
+    conn = get_db()
+    where, params = _filter_condition(conn, filters)
+    where_sql = f'WHERE {where}' if where else ''
+    db_cursor = conn.cursor()
+    db_cursor.row_factory = None
+    db_cursor.execute(f'''
+        SELECT {', '.join(RECORD_COLUMNS)} FROM records
+        {where_sql}
+        ORDER BY date_of_visit DESC, time_of_visit DESC
+    ''', params)
+    yield from _fetch_rows(db_cursor, batch_size)
+
+def get_all_records(cursor=None, per_page=20):
+    """Get all health records with keyset (cursor) pagination"""
+    conn = get_db()
+    db_cursor = conn.cursor()
+    
+    result = _keyset_page(db_cursor, None, (), cursor, per_page)
+    result.update(total=get_total_records(), total_capped=False)
+    return result
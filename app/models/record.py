@@ -0,0 +1,106 @@
+from collections import namedtuple
+
+# Columns of the records table, in schema order (see init_db)
+RECORD_COLUMNS = (
+    # Identification
+    'id', 'patient_id',
+
+    # Student Demographics
+    'full_name', 'date_of_birth', 'age', 'gender', 'grade_level',
+
+    # Contact Information
+    'parent_primary_name', 'parent_primary_phone',
+    'emergency_contact_name', 'emergency_contact_phone',
+
+    # Visit Information
+    'academic_year', 'academic_term', 'date_of_visit', 'time_of_visit',
+    'brought_in_by', 'nurse_name', 'visit_reason_category', 'severity_level', 'visit_details',
+
+    # Vital Signs
+    'temperature', 'heart_rate', 'respiratory_rate', 'oxygen_saturation',
+    'blood_pressure_systolic', 'blood_pressure_diastolic',
+    'height', 'weight', 'bmi', 'pain_scale', 'pain_location',
+
+    # Presenting Complaints
+    'presenting_complaints', 'other_complaint_details', 'complaint_background',
+
+    # Medical History
+    'past_medical_history', 'known_allergies', 'current_medications',
+    'special_medical_needs', 'chronic_conditions',
+
+    # Assessment & Care
+    'nurse_observations', 'interventions_provided', 'medications_administered',
+    'next_steps', 'other_next_step_details', 'referral_type', 'follow_up_date',
+
+    # Admission to Sick Bay
+    'admission_date', 'admission_time', 'condition_on_admission', 'plan_of_care',
+
+    # Discharge Information
+    'discharge_time', 'condition_at_discharge', 'discharge_instructions',
+    'return_to_class_time', 'parent_notified', 'parent_notification_time',
+    'incident_report_required',
+
+    # System Fields
+    'notes', 'created_at', 'updated_at'
+)
+
+# Columns rendered by the dashboard and search listings. Listing queries
+# project only these, served from the covering index idx_records_list.
+LIST_COLUMNS = (
+    'id', 'patient_id', 'full_name', 'age', 'date_of_visit', 'time_of_visit',
+    'visit_reason_category', 'visit_details', 'nurse_name'
+)
+
+class RecordSummary(namedtuple('RecordSummary', LIST_COLUMNS + ('score', 'snippet'),
+                               defaults=(None, None))):
+    """Compact, immutable row for list views (score/snippet set by ranked search)"""
+    __slots__ = ()
+
+    @property
+    def visit_reason(self):
+        """Legacy alias used by the templates"""
+        return self.visit_reason_category
+
+class HealthRecord:
+    """A full health record with one slot per records column, readable like the old dicts"""
+    __slots__ = RECORD_COLUMNS
+
+    _fields = frozenset(RECORD_COLUMNS) | {'visit_reason'}
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from a sqlite3.Row (or None)"""
+        if row is None:
+            return None
+        record = cls.__new__(cls)
+        present = set(row.keys())
+        for name in RECORD_COLUMNS:
+            setattr(record, name, row[name] if name in present else None)
+        return record
+
+    @property
+    def visit_reason(self):
+        """Legacy alias for visit_reason_category"""
+        return self.visit_reason_category
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def get(self, key, default=None):
+        """dict-style access; returns default only for unknown columns"""
+        return getattr(self, key) if key in self._fields else default
+
+    def keys(self):
+        return RECORD_COLUMNS
+
+    def to_dict(self):
+        """Return the record as a plain dict of column values"""
+        return {name: getattr(self, name) for name in RECORD_COLUMNS}
+
+    def __repr__(self):
+        return f'<HealthRecord id={self.id} patient_id={self.patient_id!r}>'
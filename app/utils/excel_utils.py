@@ -3,8 +3,13 @@ import openpyxl
 from datetime import datetime, date, time
 import os
 import re
+from itertools import chain, islice
+from operator import itemgetter
 from flask import current_app
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.utils import get_column_letter
+from ..models.record import RECORD_COLUMNS
 
 def get_excel_headers():
     """Return the list of column headers for the Excel file"""
@@ -108,138 +113,131 @@ def format_value_for_excel(value):
         return 'Yes' if value else 'No'
     return str(value)
 
-def export_records_to_excel(records, output_file=None):
-    """Export database records to Excel file with proper formatting"""
-    if not records:
+# Vitals, dates and yes/no columns are centred; free text is left-aligned
+EXPORT_CENTER_HEADERS = frozenset({
+    'Date of Visit', 'Time of Visit', 'Temperature (°C)', 'Pulse (bpm)',
+    'Respiratory Rate (cpm)', 'Oxygen Saturation (%)', 'Blood Pressure (mmHg)',
+    'Grade/Year Level', 'Parent Notified', 'Incident Report Required'
+})
+
+# Column widths are written before the rows in the sheet XML, so a streamed
+# export sizes its columns from the first rows instead of every row
+EXPORT_WIDTH_SAMPLE = 500
+
+def _export_styles(wb):
+    """Register the export's shared named styles on ``wb``"""
+    header = NamedStyle(name='Export Header')
+    header.font = Font(bold=True, color='FFFFFF')
+    header.fill = PatternFill(start_color='4F81BD', end_color='4F81BD', fill_type='solid')
+    header.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    center = NamedStyle(name='Export Center')
+    center.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+    left = NamedStyle(name='Export Left')
+    left.alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
+    for style in (header, center, left):
+        wb.add_named_style(style)
+
+# Export headers whose record column is not simply the header in snake_case
+EXPORT_HEADER_FIELDS = {
+    'Grade/Year Level': 'grade_level',
+    'Parent/Guardian Name': 'parent_primary_name',
+    'Parent/Guardian Phone': 'parent_primary_phone',
+    'Temperature (°C)': 'temperature',
+    'Pulse (bpm)': 'heart_rate',
+    'Respiratory Rate (cpm)': 'respiratory_rate',
+    'Oxygen Saturation (%)': 'oxygen_saturation',
+    'Presenting Complaint(s)': 'presenting_complaints',
+    'Next Step(s)': 'next_steps',
+    'Follow-up Date': 'follow_up_date',
+}
+
+# Exports read records as plain tuples in RECORD_COLUMNS order (see iter_records)
+_SYSTOLIC = RECORD_COLUMNS.index('blood_pressure_systolic')
+_DIASTOLIC = RECORD_COLUMNS.index('blood_pressure_diastolic')
+
+def _blood_pressure(record):
+    """Systolic/diastolic as one "120/80" value, or None unless both are set"""
+    systolic = record[_SYSTOLIC]
+    diastolic = record[_DIASTOLIC]
+    if systolic is None or diastolic is None:
         return None
-    
+    return f"{systolic}/{diastolic}"
+
+def compile_export_getters(headers):
+    """Return one getter per header over RECORD_COLUMNS tuples; ValueError for unknown headers"""
+    getters = []
+    for header in headers:
+        if header == 'Blood Pressure (mmHg)':
+            getters.append(_blood_pressure)
+            continue
+        field = EXPORT_HEADER_FIELDS.get(header, header.lower().strip().replace(' ', '_'))
+        if field not in RECORD_COLUMNS:
+            raise ValueError(f'No records column for export header {header!r}')
+        getters.append(itemgetter(RECORD_COLUMNS.index(field)))
+    return tuple(getters)
+
+EXPORT_GETTERS = compile_export_getters(get_excel_headers())
+
+def export_row(record, getters=EXPORT_GETTERS, fmt=format_value_for_excel):
+    """Return the formatted cell values of one record, in header order"""
+    return [fmt(get(record)) for get in getters]
+
+def export_records_to_excel(records, output_file=None, progress=None, progress_every=1000):
+    """Export record tuples to a formatted write-only workbook; None when there are none"""
     if output_file is None:
         output_file = os.path.join(
             os.path.dirname(current_app.config['EXCEL_FILE']),
             f"nurse_records_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
         )
     
-    # Create a new workbook and worksheet
-    wb = openpyxl.Workbook()
-    if 'Sheet' in wb.sheetnames:
-        del wb['Sheet']
-    ws = wb.create_sheet('Health Records')
-    
-    # Get headers and write them to the worksheet
     headers = get_excel_headers()
-    ws.append(headers)
-    
-    # Apply header styling, freeze pane, and initial widths
-    header_font = Font(bold=True, color='FFFFFF')
-    header_fill = PatternFill(start_color='4F81BD', end_color='4F81BD', fill_type='solid')
-    header_alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    ws.freeze_panes = 'A2'
-    ws.row_dimensions[1].height = 22
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
+    rows = map(export_row, records)
+    sample = list(islice(rows, EXPORT_WIDTH_SAMPLE))
+    if not sample:
+        return None
     
-    # Write data rows
-    for record in records:
-        # Normalize to dict
-        if hasattr(record, '__table__'):
-            record = {c.name: getattr(record, c.name) for c in record.__table__.columns}
-        
-        # Row assembly with header-to-field mapping
-        row = []
-        for header in headers:
-            # Default mapping based on header
-            normalized = header.lower().strip()
-            field_name = normalized.replace(' ', '_')
-            
-            # Explicit mappings for discrepancies/special cases
-            if header == 'Parent/Guardian Name':
-                field_name = 'parent_primary_name'
-            elif header == 'Parent/Guardian Phone':
-                field_name = 'parent_primary_phone'
-            elif header == 'Emergency Contact Name':
-                field_name = 'emergency_contact_name'
-            elif header == 'Emergency Contact Phone':
-                field_name = 'emergency_contact_phone'
-            elif header == 'Grade/Year Level':
-                field_name = 'grade_level'
-            elif header == 'Visit Reason Category':
-                # Prefer new column, fallback to legacy
-                value = record.get('visit_reason_category') or record.get('visit_reason')
-                row.append(format_value_for_excel(value))
-                continue
-            elif header == 'Temperature (°C)':
-                field_name = 'temperature'
-            elif header == 'Pulse (bpm)':
-                field_name = 'heart_rate'
-            elif header == 'Respiratory Rate (cpm)':
-                field_name = 'respiratory_rate'
-            elif header == 'Oxygen Saturation (%)':
-                field_name = 'oxygen_saturation'
-            elif header == 'Blood Pressure (mmHg)':
-                # Combine systolic/diastolic if available
-                sys_v = record.get('blood_pressure_systolic')
-                dia_v = record.get('blood_pressure_diastolic')
-                if sys_v is not None and dia_v is not None:
-                    row.append(f"{sys_v}/{dia_v}")
-                else:
-                    # Fallback to any legacy combined field
-                    row.append(format_value_for_excel(record.get('blood_pressure')))
-                continue
-            elif header == 'Visit Details':
-                field_name = 'visit_details'
-            elif header == 'Special Medical Needs':
-                field_name = 'special_medical_needs'
-            elif header == 'Next Step(s)':
-                field_name = 'next_steps'
-            elif header == 'Parent Notified':
-                field_name = 'parent_notified'
-            elif header == 'Incident Report Required':
-                field_name = 'incident_report_required'
-            elif header == 'Return to Class Time':
-                field_name = 'return_to_class_time'
-            elif header == 'Brought In By':
-                field_name = 'brought_in_by'
-            
-            # Get the value and format it
-            value = record.get(field_name, '')
-            row.append(format_value_for_excel(value))
-        
-        ws.append(row)
+    wb = openpyxl.Workbook(write_only=True)
+    _export_styles(wb)
+    ws = wb.create_sheet('Health Records')
     
-    # Auto-size columns based on content (bounded), and set alignment for cells
+    # Sheet layout has to be set before the first row is written
     max_width = 32
     min_width = 12
-    center_headers = {
-        'Date of Visit', 'Time of Visit', 'Temperature (°C)', 'Pulse (bpm)',
-        'Respiratory Rate (cpm)', 'Oxygen Saturation (%)', 'Blood Pressure (mmHg)',
-        'Grade/Year Level', 'Parent Notified', 'Incident Report Required'
-    }
-    center_align = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    left_align = Alignment(horizontal='left', vertical='center', wrap_text=True)
+    ws.freeze_panes = 'A2'
+    ws.row_dimensions[1].height = 22
+    for index, header in enumerate(headers):
+        best = max(len(header), max(len(row[index]) for row in sample))
+        ws.column_dimensions[get_column_letter(index + 1)].width = max(
+            min_width, min(int(best * 1.1) + 2, max_width)
+        )
     
-    for col in ws.columns:
-        try:
-            column_letter = col[0].column_letter
-        except Exception:
-            continue
-        # Determine width
-        lengths = []
-        for cell in col:
-            val = '' if cell.value is None else str(cell.value)
-            lengths.append(len(val))
-            # Apply alignment: center for numeric/vitals/dates headers, left otherwise
-            header_text = ws.cell(row=1, column=cell.column).value
-            if cell.row == 1:
+    header_row = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, header)
+        cell.style = 'Export Header'
+        header_row.append(cell)
+    ws.append(header_row)
+    
+    column_styles = ['Export Center' if header in EXPORT_CENTER_HEADERS else 'Export Left'
+                     for header in headers]
+    written = 0
+    for row in chain(sample, rows):
+        cells = []
+        for value, style in zip(row, column_styles):
+            if value == '':
+                # Leave blanks out of the sheet instead of writing styled empty cells
+                cells.append(None)
                 continue
-            if header_text in center_headers:
-                cell.alignment = center_align
-            else:
-                cell.alignment = left_align
-        best = max(lengths or [min_width])
-        ws.column_dimensions[column_letter].width = max(min_width, min(int(best * 1.1) + 2, max_width))
+            cell = WriteOnlyCell(ws, value)
+            cell.style = style
+            cells.append(cell)
+        ws.append(cells)
+        written += 1
+        if progress and written % progress_every == 0:
+            progress(written)
     
     # Save the workbook
     wb.save(output_file)
+    if progress:
+        progress(written)
     return output_file
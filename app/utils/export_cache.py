@@ -0,0 +1,76 @@
+import os
+import json
+import shutil
+import hashlib
+import uuid
+from flask import current_app
+from ..models.db import get_data_version
+from .excel_utils import get_excel_headers
+
+def export_cache_key(fmt, filters=None):
+    """Key for an export in ``fmt`` with ``filters``; changes whenever records or headers change"""
+    token = json.dumps({
+        'version': get_data_version(),
+        'format': fmt,
+        'filters': filters or {},
+        'headers': get_excel_headers(),
+    }, sort_keys=True)
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def _cache_path(key, fmt):
+    return os.path.join(current_app.config['EXPORT_CACHE_DIR'], f'{key}.{fmt}')
+
+def _enabled():
+    return current_app.config['EXPORT_CACHE_MAX_BYTES'] > 0
+
+def get_cached_export(key, fmt):
+    """Path of the cached export for ``key`` (mtime refreshed for eviction), or None"""
+    if not _enabled():
+        return None
+    path = _cache_path(key, fmt)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+def store_cached_export(key, fmt, path):
+    """Link a finished export into the cache, then evict down to the size limit"""
+    if not _enabled():
+        return
+    directory = current_app.config['EXPORT_CACHE_DIR']
+    os.makedirs(directory, exist_ok=True)
+    # Publish atomically: concurrent readers see the whole file or nothing
+    tmp = os.path.join(directory, f'{key}.{uuid.uuid4().hex}.tmp')
+    try:
+        try:
+            os.link(path, tmp)
+        except OSError:
+            shutil.copyfile(path, tmp)
+        os.replace(tmp, _cache_path(key, fmt))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    evict_exports()
+
+def evict_exports(max_bytes=None):
+    """Delete least recently used exports until the cache fits in ``max_bytes``"""
+    directory = current_app.config['EXPORT_CACHE_DIR']
+    if max_bytes is None:
+        max_bytes = current_app.config['EXPORT_CACHE_MAX_BYTES']
+    if not os.path.isdir(directory):
+        return
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and not entry.name.endswith('.tmp'):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
@@ -0,0 +1,198 @@
+import io
+import csv
+import json
+import numpy as np
+import pandas as pd
+from .excel_utils import get_excel_headers, export_row, EXPORT_GETTERS
+from ..models.record import RECORD_COLUMNS
+from ..models.db import (
+    chunked, begin_delta_export, iter_changed_records, get_tombstones, save_export_count
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Arrow exports are only offered with pyarrow installed
+    pa = pq = None
+
+# Typed columns in Parquet/Arrow exports; all other columns are strings
+DATE_COLUMNS = frozenset({'date_of_birth', 'date_of_visit', 'follow_up_date', 'admission_date'})
+TIMESTAMP_COLUMNS = frozenset({'created_at', 'updated_at'})
+INTEGER_COLUMNS = frozenset({
+    'id', 'age', 'heart_rate', 'respiratory_rate', 'blood_pressure_systolic',
+    'blood_pressure_diastolic', 'pain_scale'
+})
+FLOAT_COLUMNS = frozenset({'temperature', 'oxygen_saturation', 'height', 'weight', 'bmi'})
+BOOLEAN_COLUMNS = frozenset({'special_medical_needs', 'parent_notified', 'incident_report_required'})
+
+# Columnar export formats: extension -> description
+COLUMNAR_FORMATS = {
+    'parquet': 'Parquet',
+    'arrow': 'Arrow (Feather v2)',
+}
+
+# Rows per Parquet row group / Arrow record batch
+COLUMNAR_GROUP_ROWS = 50000
+
+def iter_csv(records, batch_size=1000):
+    """Yield CSV text for record tuples, one chunk per ``batch_size`` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(get_excel_headers())
+    for batch in chunked(records, batch_size):
+        writer.writerows(map(export_row, batch))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there are no records
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _record_object(record, keys):
+    """A record as a dict keyed by export header, keeping database types"""
+    return dict(zip(keys, [get(record) for get in EXPORT_GETTERS]))
+
+def iter_ndjson(records, batch_size=1000):
+    """Yield NDJSON text for record tuples, keyed by header and keeping database types"""
+    keys = get_excel_headers()
+    for batch in chunked(records, batch_size):
+        yield ''.join(
+            json.dumps(_record_object(record, keys), ensure_ascii=False) + '\n'
+            for record in batch
+        )
+
+def _delta_csv(changes, tombstones, batch_size):
+    """CSV delta: an Operation column before the export headers; returns rows sent"""
+    headers = get_excel_headers()
+    id_index = headers.index('Patient ID')
+    stamp_index = headers.index('Updated At')
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['Operation'] + headers)
+    sent = 0
+    for batch in chunked(tombstones, batch_size):
+        for patient_id, deleted_at in batch:
+            row = [''] * len(headers)
+            row[id_index] = patient_id
+            row[stamp_index] = deleted_at
+            writer.writerow(['delete'] + row)
+        sent += len(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    for batch in chunked(changes, batch_size):
+        writer.writerows(['upsert'] + export_row(record) for record in batch)
+        sent += len(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+    return sent
+
+def _delta_ndjson(changes, tombstones, batch_size):
+    """NDJSON delta: one object per change with an Operation key; returns rows sent"""
+    keys = get_excel_headers()
+    sent = 0
+    for batch in chunked(tombstones, batch_size):
+        yield ''.join(
+            json.dumps({'Operation': 'delete', 'Patient ID': patient_id, 'Updated At': deleted_at},
+                       ensure_ascii=False) + '\n'
+            for patient_id, deleted_at in batch
+        )
+        sent += len(batch)
+    for batch in chunked(changes, batch_size):
+        yield ''.join(
+            json.dumps({'Operation': 'upsert', **_record_object(record, keys)}, ensure_ascii=False) + '\n'
+            for record in batch
+        )
+        sent += len(batch)
+    return sent
+
+DELTA_FORMATS = {
+    'csv': _delta_csv,
+    'ndjson': _delta_ndjson,
+}
+
+def open_delta(consumer, fmt='ndjson', batch_size=1000, settle_seconds=5, acknowledged=None):
+    """Start a consumer's delta; returns ``(since, until, chunks)`` (see ``begin_delta_export``)"""
+    write = DELTA_FORMATS[fmt]
+    since, until = begin_delta_export(consumer, settle_seconds, acknowledged)
+
+    def chunks():
+        tombstones = get_tombstones(since, until)
+        changes = iter_changed_records(since, until, batch_size)
+        sent = yield from write(changes, tombstones, batch_size)
+        save_export_count(consumer, sent)
+
+    return since, until, chunks()
+
+def columnar_available():
+    """True when pyarrow is installed and Parquet/Arrow exports can run"""
+    return pa is not None
+
+def _arrow_type(name):
+    if name in DATE_COLUMNS:
+        return pa.date32()
+    if name in TIMESTAMP_COLUMNS:
+        return pa.timestamp('s')
+    if name in INTEGER_COLUMNS:
+        return pa.int64()
+    if name in FLOAT_COLUMNS:
+        return pa.float64()
+    if name in BOOLEAN_COLUMNS:
+        return pa.bool_()
+    return pa.string()
+
+def arrow_schema():
+    """Arrow schema of a records export: one typed field per records column"""
+    return pa.schema([pa.field(name, _arrow_type(name)) for name in RECORD_COLUMNS])
+
+def _arrow_column(name, values):
+    """Convert one column of SQLite values to a typed Arrow array; unparseable values become null"""
+    series = pd.Series(values, dtype=object)
+    if name in DATE_COLUMNS or name in TIMESTAMP_COLUMNS:
+        stamps = pd.to_datetime(series, errors='coerce', format='mixed')
+        if name in DATE_COLUMNS:
+            stamps = stamps.dt.floor('D')
+        return pa.array(stamps, from_pandas=True).cast(_arrow_type(name), safe=False)
+    if name in INTEGER_COLUMNS or name in FLOAT_COLUMNS or name in BOOLEAN_COLUMNS:
+        numbers = pd.to_numeric(series, errors='coerce')
+        if name in INTEGER_COLUMNS:
+            numbers = np.trunc(numbers).astype('Int64')
+        elif name in BOOLEAN_COLUMNS:
+            numbers = numbers.ne(0).astype('boolean').mask(numbers.isna())
+        return pa.array(numbers, type=_arrow_type(name), from_pandas=True)
+    return pa.array(series.map(str, na_action='ignore'), type=pa.string(), from_pandas=True)
+
+def _arrow_batch(schema, rows):
+    """Build a typed RecordBatch from tuples in RECORD_COLUMNS order"""
+    columns = zip(*rows)
+    return pa.RecordBatch.from_arrays(
+        [_arrow_column(name, values) for name, values in zip(RECORD_COLUMNS, columns)],
+        schema=schema
+    )
+
+def export_records_to_columnar(records, output_file, fmt='parquet', progress=None):
+    """Write record tuples to a zstd Parquet or Arrow IPC file; returns the row count"""
+    if pa is None:
+        raise RuntimeError('Parquet and Arrow exports need the pyarrow package')
+    if fmt not in COLUMNAR_FORMATS:
+        raise ValueError(f'Unsupported export format: {fmt}')
+    
+    schema = arrow_schema()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(output_file, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(output_file, schema,
+                                 options=pa.ipc.IpcWriteOptions(compression='zstd'))
+    written = 0
+    try:
+        for group in chunked(records, COLUMNAR_GROUP_ROWS):
+            writer.write_batch(_arrow_batch(schema, group))
+            written += len(group)
+            if progress:
+                progress(written)
+    finally:
+        writer.close()
+    return written
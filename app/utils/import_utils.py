@@ -0,0 +1,779 @@
+import io
+import os
+import csv
+import json
+import hashlib
+import shutil
+import zipfile
+import tempfile
+import multiprocessing
+from functools import partial
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from queue import Empty, Full
+import numpy as np
+import pandas as pd
+import openpyxl
+from ..models.db import get_db, merge_records, get_import_checkpoint, save_import_checkpoint
+
+# Database fields the importer can fill, matched against sheet headers
+IMPORT_FIELDS = (
+    'patient_id',
+    'full_name',
+    'date_of_birth',
+    'age',
+    'gender',
+    'grade_level',
+    'date_of_visit',
+    'time_of_visit',
+    'nurse_name',
+    # reason fields (support legacy and new)
+    'visit_reason',
+    'visit_reason_category',
+    'visit_details',
+    # vitals (support legacy pulse and new heart_rate)
+    'temperature',
+    'pulse',
+    'heart_rate',
+    'blood_pressure',  # combined like 120/80
+    # free text
+    'notes'
+)
+
+REQUIRED_IMPORT_FIELDS = ('full_name', 'date_of_visit', 'time_of_visit', 'nurse_name')
+
+# Record columns filled from each import field (see transform_frame)
+FIELD_COLUMNS = {
+    'patient_id': ('patient_id',),
+    'full_name': ('full_name',),
+    'date_of_birth': ('date_of_birth',),
+    'age': ('age',),
+    'gender': ('gender',),
+    'grade_level': ('grade_level',),
+    'date_of_visit': ('date_of_visit',),
+    'time_of_visit': ('time_of_visit',),
+    'nurse_name': ('nurse_name',),
+    'visit_reason': ('visit_reason_category',),
+    'visit_reason_category': ('visit_reason_category',),
+    'visit_details': ('visit_details',),
+    'temperature': ('temperature',),
+    'pulse': ('heart_rate',),
+    'heart_rate': ('heart_rate',),
+    'blood_pressure': ('blood_pressure_systolic', 'blood_pressure_diastolic'),
+    'notes': ('notes',),
+}
+
+def map_columns(columns):
+    """Map sheet columns onto IMPORT_FIELDS by normalized substring matching (later columns win)"""
+    mapping = dict.fromkeys(IMPORT_FIELDS)
+    for col in columns:
+        # Normalize column name for matching
+        col_name = str(col).strip().lower().replace(' ', '_')
+
+        # Map to database field if possible
+        for field in IMPORT_FIELDS:
+            if field in col_name or col_name in field:
+                mapping[field] = col
+                break
+    return mapping
+
+def missing_required(mapping):
+    """Return the required fields that no sheet column maps onto"""
+    return [field for field in REQUIRED_IMPORT_FIELDS if mapping.get(field) is None]
+
+def _text(series):
+    """Strings with surrounding whitespace removed; NaN and blanks become NA"""
+    text = series.astype('string').str.strip()
+    return text.mask(text == '')
+
+def _number(series):
+    """Numeric values (float) plus a mask of present values that failed to parse"""
+    numbers = pd.to_numeric(series, errors='coerce')
+    invalid = numbers.isna() & series.notna() & (series.astype('string').str.strip() != '')
+    return numbers, invalid
+
+def _integer(series):
+    """Truncate to nullable Int64 like int(value), plus a mask of values that do not fit"""
+    numbers = np.trunc(series.astype('float64'))
+    # inf, 1e400 or a 20-digit number would fail the cast for the whole chunk
+    overflow = numbers.notna() & ~(numbers.abs() < 2 ** 63)
+    return numbers.mask(overflow).astype('Int64'), overflow
+
+def _dates(series):
+    """Parse a column of dates in one pass; unparseable values become NaT"""
+    return pd.to_datetime(series, errors='coerce', format='mixed')
+
+def _times(series):
+    """Normalize times such as "9:5" or "1:30 PM" to HH:MM ("00:00" when there is none)"""
+    parts = series.astype('string').str.extract(r'(\d{1,2}):(\d{1,2})(?::\d+(?:\.\d+)?)?\s*([AaPp][Mm])?')
+    hours = pd.to_numeric(parts[0], errors='coerce')
+    minutes = pd.to_numeric(parts[1], errors='coerce')
+    meridiem = parts[2].str.upper()
+    pm = (meridiem == 'PM').fillna(False).astype(bool)
+    am = (meridiem == 'AM').fillna(False).astype(bool)
+    hours = hours.mask(pm & (hours < 12), hours + 12)
+    hours = hours.mask(am & (hours == 12), 0)
+
+    times = (hours.astype('Int64').astype('string').str.zfill(2) + ':' +
+             minutes.astype('Int64').astype('string').str.zfill(2))
+    return times.fillna('00:00')
+
+def mapped_columns(mapping):
+    """Record columns an import with this mapping writes (patient_id always)"""
+    columns = {'patient_id'}
+    for field, column in mapping.items():
+        if column is not None:
+            columns.update(FIELD_COLUMNS[field])
+    return columns
+
+def _convert(df, mapping):
+    """Convert mapped columns to record columns; returns ``(out, problems)``, one mask per rule"""
+    empty = pd.Series(pd.NA, index=df.index, dtype='object')
+
+    def source(field):
+        column = mapping.get(field)
+        return df[column] if column is not None else empty
+
+    out = pd.DataFrame(index=df.index)
+    problems = []
+
+    out['patient_id'] = _text(source('patient_id'))
+    out['full_name'] = _text(source('full_name'))
+    problems.append((out['full_name'].isna(), 'full_name', 'Missing full name'))
+
+    out['date_of_birth'] = _dates(source('date_of_birth')).dt.strftime('%Y-%m-%d')
+
+    visit_dates = _dates(source('date_of_visit'))
+    out['date_of_visit'] = visit_dates.dt.strftime('%Y-%m-%d')
+    problems.append((visit_dates.isna(), 'date_of_visit', 'Invalid date format'))
+    out['time_of_visit'] = _times(source('time_of_visit'))
+
+    age, bad_age = _number(source('age'))
+    out['age'], age_overflow = _integer(age)
+    problems.append((bad_age | age_overflow, 'age', 'Invalid age'))
+
+    out['gender'] = _text(source('gender'))
+    out['grade_level'] = _text(source('grade_level'))
+    out['nurse_name'] = _text(source('nurse_name'))
+    problems.append((out['nurse_name'].isna(), 'nurse_name', 'Missing nurse name'))
+
+    # Visit reason (prefer explicit visit_reason_category if present)
+    out['visit_reason_category'] = _text(source('visit_reason_category')).fillna(_text(source('visit_reason')))
+    out['visit_details'] = _text(source('visit_details'))
+
+    temperature, bad_temperature = _number(source('temperature'))
+    out['temperature'] = temperature
+    problems.append((bad_temperature, 'temperature', 'Invalid temperature'))
+
+    # Heart rate from either 'heart_rate' or legacy 'pulse'
+    heart_rate = pd.to_numeric(source('heart_rate'), errors='coerce')
+    pulse = pd.to_numeric(source('pulse'), errors='coerce')
+    out['heart_rate'], heart_rate_overflow = _integer(heart_rate.fillna(pulse))
+    problems.append((heart_rate_overflow, 'heart_rate' if mapping.get('heart_rate') is not None else 'pulse',
+                     'Invalid heart rate'))
+
+    # Blood pressure: parse combined strings like "120/80"
+    pressure = source('blood_pressure').astype('string').str.extract(r'(\d+)\D+(\d+)')
+    out['blood_pressure_systolic'], systolic_overflow = _integer(pd.to_numeric(pressure[0], errors='coerce'))
+    out['blood_pressure_diastolic'], diastolic_overflow = _integer(pd.to_numeric(pressure[1], errors='coerce'))
+    problems.append((systolic_overflow | diastolic_overflow, 'blood_pressure', 'Invalid blood pressure'))
+
+    out['notes'] = _text(source('notes'))
+
+    problems = [(mask.fillna(False).astype(bool), field, message) for mask, field, message in problems]
+    return out, problems
+
+def _valid_frame(out, failed, mapping, seen):
+    """Valid rows' mapped columns as sqlite-ready objects; returns ``(valid, duplicates)``"""
+    # NaN/NA -> None and numpy scalars -> Python values for sqlite
+    columns = [col for col in out.columns if col in mapped_columns(mapping)]
+    valid = out.loc[~failed.to_numpy(), columns].astype(object)
+    valid = valid.where(valid.notna(), None)
+    if seen is None:
+        return valid, []
+    return _drop_duplicates(valid, seen)
+
+def transform_frame(df, mapping, seen=None):
+    """Convert a chunk into ``(records, errors)``; errors carry source row numbers"""
+    out, problems = _convert(df, mapping)
+
+    # Build the per-row error report from the masks; the first problem wins
+    failed = pd.Series(False, index=df.index)
+    messages = pd.Series(pd.NA, index=df.index, dtype='object')
+    for mask, field, message in problems:
+        messages = messages.mask(mask & ~failed, message)
+        failed |= mask
+    errors = [(int(row), message) for row, message in messages[failed].items()]
+
+    valid, duplicates = _valid_frame(out, failed, mapping, seen)
+    if duplicates:
+        errors = sorted(errors + duplicates)
+    columns = list(valid.columns)
+    records = [dict(zip(columns, values)) for values in zip(*(valid[col].tolist() for col in columns))]
+    return records, errors
+
+def validate_frame(df, mapping, seen=None):
+    """Check a chunk, reporting every problem; returns ``(valid_count, issues)``"""
+    out, problems = _convert(df, mapping)
+    failed = pd.Series(False, index=df.index)
+    issues = []
+    for mask, field, message in problems:
+        failed |= mask
+        column = mapping.get(field)
+        values = df.loc[mask, column] if column is not None else pd.Series(None, index=df.index[mask])
+        issues.extend((int(row), column or field, value, message) for row, value in values.items())
+
+    valid, duplicates = _valid_frame(out, failed, mapping, seen)
+    column = mapping.get('patient_id') or 'patient_id'
+    issues.extend((row, column, None, message) for row, message in duplicates)
+    issues.sort(key=lambda issue: issue[0])
+    return len(valid), issues
+
+def _drop_duplicates(frame, seen):
+    """Drop rows whose patient ID (or contents) already appeared in ``seen``"""
+    digests = pd.util.hash_pandas_object(frame, index=False).tolist()
+    keep = []
+    duplicates = []
+    for row, patient_id, digest in zip(frame.index, frame['patient_id'].tolist(), digests):
+        key = ('patient_id', patient_id) if patient_id is not None else ('row', digest)
+        first = seen.setdefault(key, row)
+        keep.append(first == row)
+        if first != row:
+            if key[0] == 'patient_id':
+                duplicates.append((int(row), f'Duplicate patient ID {patient_id} (first on row {first})'))
+            else:
+                duplicates.append((int(row), f'Duplicate of row {first}'))
+    return frame[np.array(keep, dtype=bool)], duplicates
+
+class _ChunkReader:
+    """Base for readers yielding DataFrame chunks of the selected columns, indexed by row number"""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self._positions = list(range(len(columns)))
+
+    def select(self, mapping):
+        """Restrict chunks to the columns used by a ``map_columns`` mapping"""
+        # Later duplicates win, as in map_columns
+        positions = {column: i for i, column in enumerate(self.columns)}
+        used = {column for column in mapping.values() if column is not None}
+        self._positions = sorted(positions[column] for column in used)
+
+    @property
+    def selected_columns(self):
+        return [self.columns[i] for i in self._positions]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SheetReader(_ChunkReader):
+    """Stream one worksheet's mapped columns in DataFrame chunks through openpyxl's read_only mode"""
+
+    def __init__(self, source, has_headers=True, chunk_size=1000, sheet=0):
+        self.chunk_size = chunk_size
+        self.workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        self.worksheet = self.workbook.worksheets[sheet]
+
+        # Only row 1 is parsed here; the data pass starts again from the top
+        first = next(self.worksheet.iter_rows(min_row=1, max_row=1, values_only=True), None) or ()
+        if has_headers:
+            self._min_row = 2
+            columns = [
+                str(value).strip() if value is not None else f'Unnamed: {i}'
+                for i, value in enumerate(first)
+            ]
+        else:
+            self._min_row = 1
+            columns = [f'col_{i}' for i in range(len(first))]
+        super().__init__(columns)
+
+    def chunks(self):
+        """Yield DataFrames of up to chunk_size rows, indexed by sheet row number"""
+        columns = self.selected_columns
+        if not columns:
+            return
+        # Read the span of mapped columns, then keep just the mapped ones
+        first, last = self._positions[0], self._positions[-1]
+        offsets = [position - first for position in self._positions]
+        rows = self.worksheet.iter_rows(min_row=self._min_row, min_col=first + 1, max_col=last + 1,
+                                        values_only=True)
+        data, index = [], []
+        for row_number, values in enumerate(rows, start=self._min_row):
+            row = tuple(values[offset] for offset in offsets)
+            if not any(value is not None and value != '' for value in row):
+                continue
+            data.append(row)
+            index.append(row_number)
+            if len(data) >= self.chunk_size:
+                yield pd.DataFrame(data, columns=columns, index=index, dtype=object)
+                data, index = [], []
+        if data:
+            yield pd.DataFrame(data, columns=columns, index=index, dtype=object)
+
+    def close(self):
+        self.workbook.close()
+
+class CsvReader(_ChunkReader):
+    """Stream a CSV file's mapped columns in DataFrame chunks with pandas' C parser"""
+
+    def __init__(self, source, has_headers=True, chunk_size=1000):
+        self.chunk_size = chunk_size
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, newline='', encoding='utf-8-sig')
+        else:
+            self._file = io.TextIOWrapper(source, newline='', encoding='utf-8-sig')
+
+        header = next(csv.reader([self._file.readline()]), [])
+        if has_headers:
+            self._first_line = 2
+            columns = [
+                value.strip() if value.strip() else f'Unnamed: {i}'
+                for i, value in enumerate(header)
+            ]
+        else:
+            # The first line is data: rewind so the parser sees it again
+            self._first_line = 1
+            self._file.seek(0)
+            columns = [f'col_{i}' for i in range(len(header))]
+        super().__init__(columns)
+
+    def chunks(self):
+        """Yield DataFrames of up to chunk_size rows, indexed by line number"""
+        # Parse under column positions: headers may repeat (the later one wins,
+        # as for sheets). Columns are picked after parsing because usecols
+        # rejects chunks whose rows all leave out trailing optional fields.
+        reader = pd.read_csv(
+            self._file, header=None, names=range(len(self.columns)),
+            dtype=str, keep_default_na=False, na_values=[''],
+            skip_blank_lines=False, chunksize=self.chunk_size
+        )
+        positions, columns = self._positions, self.selected_columns
+        with reader:
+            for chunk in reader:
+                chunk = chunk[positions]
+                chunk.columns = columns
+                chunk.index = chunk.index + self._first_line
+                chunk = chunk.dropna(how='all')
+                if len(chunk):
+                    yield chunk.astype(object)
+
+    def close(self):
+        self._file.close()
+
+class NdjsonReader(_ChunkReader):
+    """Stream newline-delimited JSON objects in DataFrame chunks, keyed like the first chunk's objects"""
+
+    def __init__(self, source, has_headers=True, chunk_size=1000):
+        self.chunk_size = chunk_size
+        if isinstance(source, (str, os.PathLike)):
+            self._file = open(source, encoding='utf-8-sig')
+        else:
+            self._file = io.TextIOWrapper(source, encoding='utf-8-sig')
+
+        # Producers often leave out null keys, so columns come from a whole chunk
+        self._sample = []
+        self._sample_end = 0
+        for line_number, line in enumerate(self._file, start=1):
+            self._sample_end = line_number
+            if line.strip():
+                self._sample.append((line_number, _load_object(line, line_number)))
+                if len(self._sample) >= chunk_size:
+                    break
+        columns = list(dict.fromkeys(str(key) for _, item in self._sample for key in item))
+        self._known = set(columns)
+        super().__init__(columns)
+
+    def _objects(self):
+        yield from self._sample
+        for line_number, line in enumerate(self._file, start=self._sample_end + 1):
+            if line.strip():
+                item = _load_object(line, line_number)
+                if item.keys() - self._known:
+                    self._check_keys(item, line_number)
+                yield line_number, item
+
+    def _check_keys(self, item, line_number):
+        """Fail on a key first seen after the sample if it maps to an import field"""
+        for key in item.keys() - self._known:
+            if any(map_columns([key]).values()):
+                raise ValueError(f'Line {line_number}: "{key}" is missing from the first '
+                                 f'{len(self._sample)} objects, which set the columns')
+            self._known.add(key)
+
+    def chunks(self):
+        """Yield DataFrames of up to chunk_size rows, indexed by line number"""
+        columns = self.selected_columns
+        data, index = [], []
+        for line_number, item in self._objects():
+            row = tuple(item.get(column) for column in columns)
+            if not any(value is not None and value != '' for value in row):
+                continue
+            data.append(row)
+            index.append(line_number)
+            if len(data) >= self.chunk_size:
+                yield pd.DataFrame(data, columns=columns, index=index, dtype=object)
+                data, index = [], []
+        if data:
+            yield pd.DataFrame(data, columns=columns, index=index, dtype=object)
+
+    def close(self):
+        self._file.close()
+
+def _load_object(line, line_number):
+    """Parse one NDJSON line, which must hold a JSON object"""
+    try:
+        item = json.loads(line)
+    except ValueError:
+        raise ValueError(f'Line {line_number}: invalid JSON')
+    if not isinstance(item, dict):
+        raise ValueError(f'Line {line_number}: expected a JSON object')
+    return item
+
+# Readers by file extension, for uploads and the import-records command
+READERS = {
+    '.xlsx': SheetReader,
+    '.xlsm': SheetReader,
+    '.csv': CsvReader,
+    '.ndjson': NdjsonReader,
+    '.jsonl': NdjsonReader,
+}
+
+# Everything the importer accepts: the reader types plus zips of them
+IMPORT_EXTENSIONS = tuple(READERS) + ('.zip',)
+
+def open_reader(filename, source=None, has_headers=True, chunk_size=1000, **options):
+    """Open the chunked reader for ``filename``'s extension (ValueError for unknown types)"""
+    extension = os.path.splitext(filename or '')[1].lower()
+    reader = READERS.get(extension)
+    if reader is None:
+        supported = ', '.join(sorted(READERS))
+        raise ValueError(f'Unsupported file type "{extension or filename}" (expected {supported})')
+    return reader(source if source is not None else filename, has_headers, chunk_size, **options)
+
+def transform_chunks(chunks, mapping, start_after=0):
+    """Transform chunks past row ``start_after``, yielding ``(last_row, records, errors)``"""
+    seen = {}
+    for chunk in chunks:
+        last_row = int(chunk.index[-1])
+        if last_row <= start_after:
+            continue
+        chunk = chunk[chunk.index > start_after]
+        records, errors = transform_frame(chunk, mapping, seen)
+        yield last_row, records, errors
+
+def write_chunks(parsed, progress=None, checkpoint=None):
+    """Merge transformed chunks, one transaction each; returns ``(counts, errors)``"""
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    errors = []
+    imported = 0
+    for last_row, records, chunk_errors in parsed:
+        imported += len(records)
+        errors.extend(chunk_errors)
+        # With rows to merge the checkpoint joins merge_records' transaction;
+        # a chunk of only errors commits its checkpoint on its own
+        save = None
+        if checkpoint is not None:
+            save = partial(checkpoint, last_row, imported, len(errors), commit=not records)
+        try:
+            if records:
+                for key, count in merge_records(records, save).items():
+                    counts[key] += count
+            elif save is not None:
+                save()
+        except Exception:
+            # Nothing from a failed chunk may ride along with a later commit
+            get_db().rollback()
+            raise
+        if progress is not None:
+            progress(imported + len(errors))
+    return counts, errors
+
+def import_chunks(chunks, mapping, progress=None, start_after=0, checkpoint=None):
+    """Transform and merge each chunk as it arrives (see ``write_chunks``)"""
+    return write_chunks(transform_chunks(chunks, mapping, start_after), progress, checkpoint)
+
+def list_sources(path, workdir, label=None):
+    """Split an upload into ``(label, path, sheet)`` sources: one per worksheet or zip member"""
+    label = label or os.path.basename(path)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.zip':
+        sources = []
+        with zipfile.ZipFile(path) as archive:
+            for number, info in enumerate(archive.infolist()):
+                name = info.filename
+                member_extension = os.path.splitext(name)[1].lower()
+                if (info.is_dir() or member_extension not in READERS or name.startswith('__MACOSX/')
+                        or os.path.basename(name).startswith('.')):
+                    continue
+                # Member names are untrusted, so extract under a generated one
+                target = os.path.join(workdir, f'{number}{member_extension}')
+                with archive.open(info) as src, open(target, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                sources.extend(list_sources(target, workdir, name))
+        if not sources:
+            raise ValueError('The zip file contains no Excel, CSV or NDJSON files')
+        return sources
+    if extension in ('.xlsx', '.xlsm'):
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        titles = [worksheet.title for worksheet in workbook.worksheets]
+        workbook.close()
+        if len(titles) > 1:
+            return [(f'{label} / {title}', path, i) for i, title in enumerate(titles)]
+        return [(label, path, 0)]
+    return [(label, path, None)]
+
+def _open_source(path, sheet, has_headers, chunk_size):
+    """Open a source's reader and map its columns: ``(reader, mapping, missing_cols)``"""
+    options = {} if sheet is None else {'sheet': sheet}
+    reader = open_reader(path, has_headers=has_headers, chunk_size=chunk_size, **options)
+    mapping = map_columns(reader.columns)
+    missing_cols = missing_required(mapping)
+    # Read only the mapped columns
+    reader.select(mapping)
+    return reader, mapping, missing_cols
+
+# Parsed chunks a batch worker may get ahead of the writer
+WORKER_QUEUE_CHUNKS = 2
+
+# Set in each batch worker process by _init_worker
+_worker_queues = None
+_worker_cancel = None
+
+def _init_worker(queues, cancel):
+    global _worker_queues, _worker_cancel
+    _worker_queues, _worker_cancel = queues, cancel
+
+def _send(slot, item):
+    """Put ``item`` on the slot's queue, waiting for room; False once the batch is cancelled"""
+    queue = _worker_queues[slot]
+    while not _worker_cancel.is_set():
+        try:
+            queue.put(item, timeout=1)
+            return True
+        except Full:
+            pass
+    # Exit without waiting for the writer to drain what is still buffered
+    queue.cancel_join_thread()
+    return False
+
+def _parse_source(slot, path, sheet, has_headers, chunk_size, start_after):
+    """Batch worker: send one source's ``(last_row, records, errors)`` chunks, then None"""
+    reader, mapping, _ = _open_source(path, sheet, has_headers, chunk_size)
+    with reader:
+        for parsed in transform_chunks(reader.chunks(), mapping, start_after):
+            if not _send(slot, parsed):
+                return
+    _send(slot, None)
+
+def _receive(queue, future):
+    """Yield the chunks a worker sends for one source, re-raising its failure"""
+    while True:
+        try:
+            item = queue.get(timeout=1)
+        except Empty:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+            continue
+        if item is None:
+            return
+        yield item
+
+def _report_value(value):
+    """Cell value as report text (blank for missing values)"""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ''
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+def validate_file(path, report_path, has_headers=True, chunk_size=1000, progress=None, filename=None):
+    """Dry run: write every problem in an upload to a CSV report and return a summary"""
+    rows = valid = 0
+    by_column = {}
+    mappings = {}
+    skipped_sources = []
+    sample = []
+    workdir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        sources = list_sources(path, workdir, filename)
+        with open(report_path, 'w', newline='', encoding='utf-8') as report:
+            writer = csv.writer(report)
+            writer.writerow(['Source', 'Row', 'Column', 'Value', 'Problem'])
+            for label, source_path, sheet in sources:
+                reader, mapping, missing_cols = _open_source(source_path, sheet, has_headers, chunk_size)
+                with reader:
+                    if missing_cols:
+                        message = f'Missing required columns: {", ".join(missing_cols)}'
+                        if len(sources) == 1:
+                            raise ValueError(message)
+                        skipped_sources.append(f'{label}: {message}')
+                        continue
+                    mappings[label] = {field: column for field, column in mapping.items() if column is not None}
+
+                    seen = {}
+                    for chunk in reader.chunks():
+                        valid_count, issues = validate_frame(chunk, mapping, seen)
+                        rows += len(chunk)
+                        valid += valid_count
+                        issues = [(label, row, column, _report_value(value), message)
+                                  for row, column, value, message in issues]
+                        writer.writerows(issues)
+                        for issue in issues:
+                            by_column[issue[2]] = by_column.get(issue[2], 0) + 1
+                        sample.extend(issues[:20 - len(sample)])
+                        if progress is not None:
+                            progress(rows)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'rows': rows,
+        'valid': valid,
+        'invalid': rows - valid,
+        'issues': by_column,
+        'mappings': mappings,
+        'skipped_sources': skipped_sources,
+        'sample': sample,
+    }
+
+def file_digest(path):
+    """sha256 hex digest of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def import_file(path, has_headers=True, chunk_size=1000, progress=None, force=False,
+                filename=None, file_hash=None, processes=1):
+    """Import a file with per-source checkpoints, resuming or skipping it by content hash"""
+    filename = filename or os.path.basename(path)
+    file_hash = file_hash or file_digest(path)
+    previous = get_import_checkpoint(file_hash)
+    if previous is not None and previous['status'] == 'complete' and not force:
+        return {'skipped': True, 'resumed_from': 0, 'imported': previous['imported'],
+                'error_count': previous['error_count'], 'errors': []}
+
+    summary = {
+        'skipped': False, 'resumed_from': 0, 'imported': 0,
+        'inserted': 0, 'updated': 0, 'unchanged': 0,
+        'error_count': 0, 'errors': [], 'sources': 0, 'skipped_sources': [],
+    }
+
+    def resume_point(key):
+        """``(start_after, imported, error_count)`` to continue from, or None when done"""
+        checkpoint_row = get_import_checkpoint(key)
+        if checkpoint_row is None or (force and checkpoint_row['status'] == 'complete'):
+            return 0, 0, 0
+        if checkpoint_row['status'] == 'complete':
+            return None
+        return checkpoint_row['last_row'], checkpoint_row['imported'], checkpoint_row['error_count']
+
+    def write(key, label, parsed, resume, prefix=''):
+        """Merge one source's chunks, checkpointing it under ``key``"""
+        start_after, imported_before, errors_before = resume
+        handled_before = summary['imported'] + summary['error_count']
+
+        def checkpoint(last_row, imported, error_count, commit):
+            save_import_checkpoint(key, label, last_row, imported_before + imported,
+                                   errors_before + error_count, commit=commit)
+
+        def report(handled):
+            if progress is not None:
+                progress(handled_before + imported_before + errors_before + handled)
+
+        counts, errors = write_chunks(parsed, report, checkpoint)
+        imported = sum(counts.values())
+        checkpoint_row = get_import_checkpoint(key)
+        save_import_checkpoint(key, label, checkpoint_row['last_row'] if checkpoint_row else start_after,
+                               imported_before + imported, errors_before + len(errors), status='complete')
+
+        for name, count in counts.items():
+            summary[name] += count
+        summary['imported'] += imported_before + imported
+        summary['error_count'] += errors_before + len(errors)
+        summary['errors'].extend((row, f'{prefix}{message}') for row, message in errors)
+        summary['sources'] += 1
+
+    workdir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        sources = list_sources(path, workdir, filename)
+        if len(sources) == 1:
+            # A single sheet or file streams chunk by chunk in this process
+            label, source_path, sheet = sources[0]
+            resume = resume_point(file_hash)
+            reader, mapping, missing_cols = _open_source(source_path, sheet, has_headers, chunk_size)
+            with reader:
+                if missing_cols:
+                    raise ValueError(f'Missing required columns: {", ".join(missing_cols)}')
+                write(file_hash, filename, transform_chunks(reader.chunks(), mapping, resume[0]), resume)
+            summary['resumed_from'] = resume[0]
+        else:
+            _import_batch(sources, file_hash, has_headers, chunk_size, processes,
+                          resume_point, write, summary)
+            save_import_checkpoint(file_hash, filename, 0, summary['imported'],
+                                   summary['error_count'], status='complete')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary['errors'] = summary['errors'][:100]  # Enough to fix the file; the count covers the rest
+    return summary
+
+def _import_batch(sources, file_hash, has_headers, chunk_size, processes, resume_point, write, summary):
+    """Write a batch's sources in turn, parsed ahead in up to ``processes`` worker processes"""
+    usable = []
+    for label, source_path, sheet in sources:
+        key = f'{file_hash}:{label}'
+        resume = resume_point(key)
+        if resume is None:
+            # Finished in an earlier attempt: count it from its checkpoint
+            finished = get_import_checkpoint(key)
+            summary['imported'] += finished['imported']
+            summary['error_count'] += finished['error_count']
+            summary['sources'] += 1
+            continue
+        reader, _, missing_cols = _open_source(source_path, sheet, has_headers, chunk_size)
+        reader.close()
+        if missing_cols:
+            summary['skipped_sources'].append(f'{label}: Missing required columns: {", ".join(missing_cols)}')
+            continue
+        usable.append((key, label, source_path, sheet, resume))
+
+    if len(usable) < 2 or processes < 2:
+        for key, label, source_path, sheet, resume in usable:
+            reader, mapping, _ = _open_source(source_path, sheet, has_headers, chunk_size)
+            with reader:
+                write(key, label, transform_chunks(reader.chunks(), mapping, resume[0]), resume,
+                      prefix=f'{label}: ')
+        return
+
+    # spawn: the writer runs inside a threaded web worker, where fork is unsafe
+    context = multiprocessing.get_context('spawn')
+    workers = min(processes, len(usable))
+    queues = [context.Queue(WORKER_QUEUE_CHUNKS) for _ in range(workers)]
+    cancel = context.Event()
+    free = list(range(workers))
+    waiting = deque(usable)
+    running = deque()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(queues, cancel)) as pool:
+        try:
+            while waiting or running:
+                # One source per queue slot; the oldest is always being parsed
+                while waiting and free:
+                    key, label, source_path, sheet, resume = waiting.popleft()
+                    slot = free.pop()
+                    future = pool.submit(_parse_source, slot, source_path, sheet,
+                                         has_headers, chunk_size, resume[0])
+                    running.append((slot, future, key, label, resume))
+                slot, future, key, label, resume = running.popleft()
+                write(key, label, _receive(queues[slot], future), resume, prefix=f'{label}: ')
+                free.append(slot)
+        except BaseException:
+            # Unblock workers waiting on a full queue so the pool can shut down
+            cancel.set()
+            raise
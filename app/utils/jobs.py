@@ -0,0 +1,93 @@
+import os
+import time
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from ..models.db import get_db, create_job, update_job
+
+class Job:
+    """Handle passed to a running job function"""
+
+    def __init__(self, job_id, directory):
+        self.id = job_id
+        self.directory = directory
+
+    def progress(self, done, total=None):
+        """Report rows processed so far (and the expected total, if known)"""
+        fields = {'progress': done}
+        if total is not None:
+            fields['total'] = total
+        update_job(self.id, **fields)
+
+    def path(self, filename):
+        """Path for a file belonging to this job, e.g. an upload or an export"""
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, filename)
+
+class JobRunner:
+    """Run imports and exports on a thread pool, with their state in the jobs table"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executors = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['jobs'] = self
+
+    def _executor(self):
+        # Threads do not survive a fork, so keep one pool per worker process
+        pid = os.getpid()
+        executor = self._executors.get(pid)
+        if executor is None:
+            executor = self._executors[pid] = ThreadPoolExecutor(
+                max_workers=self.app.config['JOB_WORKERS'], thread_name_prefix='job'
+            )
+        return executor
+
+    def directory(self, job_id):
+        return os.path.join(self.app.config['JOBS_DIR'], job_id)
+
+    def create(self, kind):
+        """Record a queued job and return its ``Job`` handle (not yet started)"""
+        self._prune()
+        job_id = create_job(kind)
+        return Job(job_id, self.directory(job_id))
+
+    def start(self, job, func, *args, **kwargs):
+        """Run ``func(job, *args, **kwargs)`` on the pool"""
+        self._executor().submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Create a job and start it; returns the job id"""
+        return self.start(self.create(kind), func, *args, **kwargs)
+
+    def _run(self, job, func, args, kwargs):
+        with self.app.app_context():
+            update_job(job.id, status='running')
+            try:
+                result = func(job, *args, **kwargs) or {}
+            except Exception as e:
+                self.app.logger.exception('Job %s failed', job.id)
+                # Drop any half-written transaction before committing the status
+                get_db().rollback()
+                update_job(job.id, status='failed', message=str(e))
+                return
+            file_path = result.pop('file_path', None)
+            download_name = result.pop('download_name', None)
+            update_job(job.id, status='done', result=result,
+                       file_path=file_path, download_name=download_name)
+
+    def _prune(self):
+        """Delete job files older than JOB_FILE_MAX_AGE seconds"""
+        root = self.app.config['JOBS_DIR']
+        if not os.path.isdir(root):
+            return
+        cutoff = time.time() - self.app.config['JOB_FILE_MAX_AGE']
+        for entry in os.scandir(root):
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+jobs = JobRunner()
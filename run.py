@@ -3,7 +3,11 @@ import os
 
 # Get environment or default to development
 config_name = os.environ.get('FLASK_ENV', 'development')
-app = create_app(config_name)
+# Spawned import workers (see import_utils._import_batch) re-import this
+# module as __mp_main__; they only parse files, so skip building the app
+# and initializing the database there
+if __name__ != '__mp_main__':
+    app = create_app(config_name)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5001))
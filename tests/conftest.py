@@ -0,0 +1,15 @@
+import pytest
+from app import create_app
+from app.config.config import DevelopmentConfig
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App on a throwaway database, job directory and export cache"""
+    instance = tmp_path / 'instance'
+    monkeypatch.setattr(DevelopmentConfig, 'DB_FILE', str(instance / 'nurse_records.db'))
+    monkeypatch.setattr(DevelopmentConfig, 'JOBS_DIR', str(instance / 'jobs'))
+    monkeypatch.setattr(DevelopmentConfig, 'EXPORT_CACHE_DIR', str(instance / 'export_cache'))
+    app = create_app('development')
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        yield app
@@ -0,0 +1,48 @@
+import json
+import time
+from app.models.db import create_records, get_db
+
+def _record(patient_id, updated_at):
+    return {'patient_id': patient_id, 'full_name': f'Student {patient_id}', 'date_of_visit': '2024-01-15',
+            'time_of_visit': '09:30', 'nurse_name': 'Nurse Joy', 'updated_at': updated_at}
+
+def _delta(client, **params):
+    response = client.get('/export/delta.ndjson', query_string={'consumer': 'district', **params})
+    if response.status_code != 200:
+        return response, None
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    return response, [(row['Operation'], row['Patient ID']) for row in rows]
+
+def test_delta_advances_only_when_acknowledged(app):
+    app.config['EXPORT_DELTA_SETTLE_SECONDS'] = 0
+    create_records([_record('P001', '2024-01-01 08:00:00'), _record('P002', '2024-01-01 08:00:00')])
+    client = app.test_client()
+
+    response, first = _delta(client)
+    assert first == [('upsert', 'P001'), ('upsert', 'P002')]
+    # Not acknowledged yet: a repeat (prefetch, retry) sends the same changes
+    response, again = _delta(client)
+    assert again == first
+    watermark = response.headers['X-Export-Watermark']
+
+    get_db().execute("DELETE FROM records WHERE patient_id = 'P001'")
+    get_db().commit()
+    create_records([_record('P003', watermark)])
+    time.sleep(1)  # Watermarks have one-second resolution
+
+    response, delta = _delta(client, since=watermark)
+    assert response.headers['X-Export-Since'] == watermark
+    assert delta == [('delete', 'P001'), ('upsert', 'P003')]
+    # The acknowledged window is not sent again
+    response, repeat = _delta(client, since=watermark)
+    assert repeat == delta
+
+def test_delta_rejects_stale_or_unissued_watermarks(app):
+    client = app.test_client()
+    response, _ = _delta(client)
+    watermark = response.headers['X-Export-Watermark']
+    assert _delta(client, since=watermark)[0].status_code == 200
+
+    assert _delta(client, since='2000-01-01 00:00:00')[0].status_code == 400
+    assert _delta(client, since='2999-01-01 00:00:00')[0].status_code == 400
+    assert _delta(client, since='yesterday')[0].status_code == 400
@@ -0,0 +1,97 @@
+import os
+import zipfile
+import pytest
+from app.models import db
+from app.utils import import_utils
+from app.models.db import get_db, get_import_checkpoint
+from app.utils.import_utils import import_file, file_digest
+from app.utils.jobs import jobs
+
+def _write_csv(path, rows, prefix='P'):
+    lines = ['Patient ID,Full Name,Date of Visit,Time of Visit,Nurse Name']
+    lines += [f'{prefix}{i:03d},Student {i},2024-01-15,09:30,Nurse Joy' for i in range(1, rows + 1)]
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+def _record_count():
+    return get_db().execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+def test_failed_chunk_does_not_advance_checkpoint(app, tmp_path, monkeypatch):
+    path = _write_csv(tmp_path / 'visits.csv', 25)
+    assign = db._assign_patient_ids
+    calls = []
+
+    def flaky_assign(conn, batch, taken):
+        calls.append(len(batch))
+        if len(calls) == 3:
+            raise RuntimeError('transient failure')
+        return assign(conn, batch, taken)
+
+    monkeypatch.setattr(db, '_assign_patient_ids', flaky_assign)
+    with pytest.raises(RuntimeError):
+        import_file(path, chunk_size=5)
+    # Whatever commits next (here the job's failed status) must not carry chunk 3's checkpoint
+    get_db().commit()
+
+    checkpoint = get_import_checkpoint(file_digest(path))
+    assert checkpoint['last_row'] == 11
+    assert checkpoint['imported'] == 10
+    assert _record_count() == 10
+
+    monkeypatch.setattr(db, '_assign_patient_ids', assign)
+    summary = import_file(path, chunk_size=5)
+    assert summary['resumed_from'] == 11
+    assert summary['imported'] == 25
+    assert _record_count() == 25
+
+def test_failed_job_rolls_back_open_transaction(app):
+    def failing(job):
+        get_db().execute(
+            'INSERT INTO records (patient_id, full_name, date_of_visit, time_of_visit, nurse_name) '
+            "VALUES ('P999', 'Half Written', '2024-01-15', '09:30', 'Nurse Joy')"
+        )
+        raise RuntimeError('boom')
+
+    job = jobs.create('import')
+    jobs._run(job, failing, (), {})
+
+    assert get_db().execute('SELECT status FROM jobs WHERE id = ?', (job.id,)).fetchone()[0] == 'failed'
+    assert _record_count() == 0
+
+def test_resumed_batch_counts_sources_finished_earlier(app, tmp_path, monkeypatch):
+    first = _write_csv(tmp_path / 'first.csv', 5)
+    second = _write_csv(tmp_path / 'second.csv', 8, prefix='Q')
+    path = tmp_path / 'visits.zip'
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.write(first, 'first.csv')
+        archive.write(second, 'second.csv')
+
+    merge = db.merge_records
+    calls = []
+
+    def flaky_merge(records, checkpoint=None):
+        calls.append(len(records))
+        if len(calls) == 3:
+            raise RuntimeError('transient failure')
+        return merge(records, checkpoint)
+
+    monkeypatch.setattr(import_utils, 'merge_records', flaky_merge)
+    with pytest.raises(RuntimeError):
+        import_file(str(path), chunk_size=5, processes=2)
+
+    monkeypatch.setattr(import_utils, 'merge_records', merge)
+    summary = import_file(str(path), chunk_size=5, processes=2)
+    assert summary['imported'] == 13
+    assert _record_count() == 13
+    # A re-upload reports the whole batch
+    assert import_file(str(path), chunk_size=5)['imported'] == 13
+
+def test_init_fails_jobs_left_under_a_reused_pid(app):
+    conn = get_db()
+    conn.execute(
+        "INSERT INTO jobs (id, kind, status, worker_pid, worker_started) VALUES (?, 'import', 'running', ?, ?)",
+        ('stale', os.getpid(), db._process_started(os.getpid()))
+    )
+    conn.commit()
+    db.init_db()
+    assert db.get_job('stale')['status'] == 'failed'
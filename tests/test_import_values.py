@@ -0,0 +1,56 @@
+import pytest
+from app.models.db import get_db
+from app.utils.import_utils import import_file, validate_file
+
+HEADER = 'Full Name,Date of Visit,Time of Visit,Nurse Name,Age,Pulse,Blood Pressure\n'
+
+def test_out_of_range_numbers_fail_their_row_only(app, tmp_path):
+    path = tmp_path / 'visits.csv'
+    path.write_text(HEADER +
+                    'Ann,2024-01-15,09:30,Nurse Joy,inf,80,120/80\n'
+                    'Ben,2024-01-15,09:30,Nurse Joy,1e20,80,120/80\n'
+                    'Cal,2024-01-15,09:30,Nurse Joy,9,1e400,120/80\n'
+                    'Dee,2024-01-15,09:30,Nurse Joy,9,80,99999999999999999999/80\n'
+                    'Eve,2024-01-15,09:30,Nurse Joy,9,80,120/80\n')
+
+    report = validate_file(str(path), str(tmp_path / 'report.csv'))
+    assert (report['valid'], report['invalid']) == (1, 4)
+
+    summary = import_file(str(path))
+    assert summary['imported'] == 1
+    assert summary['errors'] == [(2, 'Invalid age'), (3, 'Invalid age'),
+                                 (4, 'Invalid heart rate'), (5, 'Invalid blood pressure')]
+    row = get_db().execute('SELECT full_name, age, heart_rate, blood_pressure_systolic FROM records').fetchone()
+    assert tuple(row) == ('Eve', 9, 80, 120)
+
+def test_csv_rows_may_leave_out_trailing_fields(app, tmp_path):
+    path = tmp_path / 'visits.csv'
+    path.write_text('Full Name,Date of Visit,Time of Visit,Nurse Name,Notes\n'
+                    'Ann,2024-01-15,09:30,Nurse Joy\n'
+                    'Ben,2024-01-15,09:30,Nurse Joy,Sore throat\n')
+
+    # One row per chunk, so the first chunk holds only the short row
+    assert import_file(str(path), chunk_size=1)['imported'] == 2
+    rows = get_db().execute('SELECT full_name, notes FROM records ORDER BY full_name').fetchall()
+    assert [tuple(row) for row in rows] == [('Ann', None), ('Ben', 'Sore throat')]
+
+def test_ndjson_columns_include_keys_left_out_of_the_first_object(app, tmp_path):
+    path = tmp_path / 'visits.ndjson'
+    path.write_text('{"full_name": "Ann", "date_of_visit": "2024-01-15", "time_of_visit": "09:30", '
+                    '"nurse_name": "Nurse Joy"}\n'
+                    '{"patient_id": "PB", "full_name": "Ben", "date_of_visit": "2024-01-15", '
+                    '"time_of_visit": "09:30", "nurse_name": "Nurse Joy", "notes": "hello"}\n')
+
+    assert import_file(str(path))['imported'] == 2
+    row = get_db().execute("SELECT patient_id, notes FROM records WHERE full_name = 'Ben'").fetchone()
+    assert tuple(row) == ('PB', 'hello')
+
+def test_ndjson_key_first_seen_after_the_sample_is_an_error(app, tmp_path):
+    path = tmp_path / 'visits.ndjson'
+    path.write_text('{"full_name": "Ann", "date_of_visit": "2024-01-15", "time_of_visit": "09:30", '
+                    '"nurse_name": "Nurse Joy", "extra": 1}\n'
+                    '{"full_name": "Ben", "date_of_visit": "2024-01-15", "time_of_visit": "09:30", '
+                    '"nurse_name": "Nurse Joy", "unused": 2, "notes": "hello"}\n')
+
+    with pytest.raises(ValueError, match='Line 2: "notes"'):
+        import_file(str(path), chunk_size=1)
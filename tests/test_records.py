@@ -0,0 +1,57 @@
+from app.models.db import create_records, merge_records, get_all_records, search_records, get_db
+
+def _record(i, **fields):
+    record = {'patient_id': f'P{i:03d}', 'full_name': f'Student {i}', 'date_of_visit': f'2024-01-{i % 3 + 1:02d}',
+              'time_of_visit': '09:30', 'nurse_name': 'Nurse Joy'}
+    record.update(fields)
+    return record
+
+def _walk(fetch, per_page):
+    """Page forward to the end, then back to the start; returns both id lists"""
+    forward, page = [], fetch(None, per_page)
+    while True:
+        forward.append([item.id for item in page['items']])
+        if not page['next_cursor']:
+            break
+        page = fetch(page['next_cursor'], per_page)
+    backward = [[item.id for item in page['items']]]
+    while page['prev_cursor']:
+        page = fetch(page['prev_cursor'], per_page)
+        backward.append([item.id for item in page['items']])
+    return forward, backward[::-1]
+
+def test_keyset_pages_visit_every_record_once_in_order(app):
+    # Many rows share a date and time, so the id tiebreak decides the order
+    create_records([_record(i) for i in range(23)])
+    expected = [row[0] for row in get_db().execute(
+        'SELECT id FROM records ORDER BY date_of_visit DESC, time_of_visit DESC, id DESC'
+    )]
+
+    forward, backward = _walk(lambda cursor, per_page: get_all_records(cursor, per_page), 5)
+    assert sum(forward, []) == expected
+    assert [len(ids) for ids in forward] == [5, 5, 5, 5, 3]
+    assert backward == forward
+
+def test_ranked_search_pages_visit_every_match_once(app):
+    create_records([_record(i, full_name=f'Smith {"Smith " * (i % 4)}{i}') for i in range(12)] +
+                   [_record(i, full_name=f'Jones {i}') for i in range(12, 20)])
+
+    assert search_records('smith', None, 5)['items'][0].score is not None  # Ranked full-text path
+    forward, backward = _walk(lambda cursor, per_page: search_records('smith', cursor, per_page), 5)
+    found = sum(forward, [])
+    assert len(found) == len(set(found)) == 12
+    assert backward == forward
+    # Substring fallback when no whole word matches
+    forward, _ = _walk(lambda cursor, per_page: search_records('mit', cursor, per_page), 5)
+    assert len(set(sum(forward, []))) == 12
+
+def test_merge_records_counts_and_keeps_unmapped_columns(app):
+    create_records([_record(1, notes='Allergic to peanuts')])
+
+    assert merge_records([_record(1), _record(2)]) == {'inserted': 1, 'updated': 0, 'unchanged': 1}
+    assert merge_records([_record(1, nurse_name='Nurse Ann'), _record(2), _record(3)]) == \
+        {'inserted': 1, 'updated': 1, 'unchanged': 1}
+
+    row = get_db().execute("SELECT nurse_name, notes FROM records WHERE patient_id = 'P001'").fetchone()
+    assert tuple(row) == ('Nurse Ann', 'Allergic to peanuts')
+    assert get_db().execute('SELECT COUNT(*) FROM records').fetchone()[0] == 3